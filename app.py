@@ -1,14 +1,18 @@
 # file: app.py
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
-from matching_engine import Recommender
+from batch_match import stream_ndjson
+from caching import LRUCache, SQLiteLRUCache
+from catalog_changes import CatalogChangeLog
+from lazy_imports import is_installed, optional_import
+from metrics import metrics
 from resume_parser import ResumeParser
+from resume_queue import ResumeQueue
+import io
 import os
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+import threading
+import time
 
 app = Flask(__name__)
 CORS(app)
@@ -17,19 +21,130 @@ DATA_FILE_PATH = os.path.join('data', 'jobs.csv')
 
 API_KEY = "YOUR_API_KEY_HERE"
 
-if API_KEY != "YOUR_API_KEY_HERE" and genai:
+# Catalog admin endpoints are disabled unless a token is configured.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Stage timings and /metrics are off unless METRICS_ENABLED is set; SERVER_TIMING
+# additionally returns each request's stage breakdown in a Server-Timing header.
+if os.environ.get('METRICS_ENABLED'):
+    metrics.enable(server_timing=bool(os.environ.get('SERVER_TIMING')))
+
+if API_KEY != "YOUR_API_KEY_HERE" and is_installed('google.generativeai'):
     try:
-        genai.configure(api_key=API_KEY)
+        optional_import('google.generativeai').configure(api_key=API_KEY)
         print("Google Generative AI configured successfully.")
     except Exception as e:
         print(f"Error configuring Google AI: {e}")
 else:
     print("WARNING: API key not set in app.py or 'google-generativeai' is not installed.")
 
-print("Initializing the recommendation engine...")
-recommender = Recommender(DATA_FILE_PATH, api_key=API_KEY)
-resume_parser = ResumeParser(api_key=API_KEY)
-print("Recommendation engine initialized successfully.")
+# Startup modes:
+# - default: the engine loads while this module is imported.
+# - LAZY_STARTUP=1: import returns at once and the engine loads in a background
+#   thread; requests get 503 until /readyz reports ready.
+# - gunicorn -c gunicorn.conf.py app:app: PRELOAD_APP is set and the engine loads
+#   once in the master, so forked workers share the model and catalog pages.
+recommender = None
+resume_parser = None
+resume_queue = None
+_ready = threading.Event()
+
+def warm_up():
+    """Loads the model, catalog and embedding index and runs a warm-up encode."""
+    global recommender, resume_parser, resume_queue
+    # Imported here so `import app` stays fast when the engine loads later.
+    from matching_engine import Recommender
+    print("Initializing the recommendation engine...")
+    start = time.perf_counter()
+    # Admin catalog changes go through this file so every gunicorn worker applies them;
+    # set CATALOG_CHANGES_PATH to '' to apply them only in the worker that receives them.
+    changes_path = os.environ.get('CATALOG_CHANGES_PATH', os.path.join('data', 'catalog_changes.sqlite'))
+    recommender = Recommender(DATA_FILE_PATH, api_key=API_KEY, change_log=CatalogChangeLog(changes_path) if changes_path else None)
+    # Parsed resumes are cached by file and text hash; set RESUME_CACHE_PATH to '' to keep them in memory only.
+    resume_cache_path = os.environ.get('RESUME_CACHE_PATH', os.path.join('data', 'resume_cache.sqlite')) or None
+    resume_parser = ResumeParser(
+        api_key=API_KEY,
+        cache_path=resume_cache_path,
+        max_pages=int(os.environ.get('RESUME_MAX_PAGES', '20')),
+        max_bytes=int(float(os.environ.get('RESUME_MAX_MB', '10')) * 1024 * 1024),
+    )
+    # Job states go in the same SQLite file, so a status poll can land on any worker.
+    if resume_cache_path:
+        job_store = SQLiteLRUCache(resume_cache_path, max_size=1000, table='resume_jobs')
+    else:
+        job_store = LRUCache(max_size=1000, ttl=3600)
+    resume_queue = ResumeQueue(
+        resume_parser,
+        job_store,
+        max_pending=int(os.environ.get('RESUME_QUEUE_DEPTH', '16')),
+        llm_workers=int(os.environ.get('RESUME_LLM_WORKERS', '4')),
+        extract_workers=int(os.environ.get('RESUME_EXTRACT_WORKERS', '2')),
+    )
+    recommender.semantic_matcher.warm_up()
+    _ready.set()
+    print(f"Recommendation engine initialized in {time.perf_counter() - start:.1f}s.")
+    if not os.environ.get('PRELOAD_APP'):
+        start_background_tasks()
+
+def start_background_tasks():
+    """Starts per-process threads; threads do not survive a fork, so preloaded workers call this after forking."""
+    recommender.semantic_matcher.apply_thread_count()
+    if os.environ.get('CATALOG_WATCH_SECONDS'):
+        recommender.watch_catalog(float(os.environ['CATALOG_WATCH_SECONDS']))
+    if recommender.change_log is not None:
+        recommender.follow_changes(float(os.environ.get('CATALOG_CHANGES_POLL_SECONDS', '1')))
+
+def _warm_up_in_background():
+    try:
+        warm_up()
+    except Exception as e:
+        print(f"Error initializing the recommendation engine: {e}", flush=True)
+
+if __name__ == '__mp_main__':
+    # Imported as the main script by a process pool's fork server (see process_pool); its workers need no engine.
+    pass
+elif os.environ.get('LAZY_STARTUP') and not os.environ.get('PRELOAD_APP'):
+    threading.Thread(target=_warm_up_in_background, name='warm-up', daemon=True).start()
+else:
+    warm_up()
+
+# Probes, metrics and the static page are served while the engine is still loading.
+_AVAILABLE_WHILE_STARTING = {'healthz', 'readyz', 'metrics_route', 'index', 'static'}
+
+@app.before_request
+def require_ready():
+    if not _ready.is_set() and request.endpoint not in _AVAILABLE_WHILE_STARTING:
+        return jsonify({"error": "The recommendation engine is starting up."}), 503, {'Retry-After': '5'}
+
+@app.before_request
+def start_request_trace():
+    if metrics.server_timing:
+        metrics.start_trace()
+
+@app.after_request
+def add_server_timing(response):
+    if metrics.server_timing:
+        trace = metrics.end_trace()
+        if trace:
+            response.headers['Server-Timing'] = metrics.server_timing_header(trace)
+    return response
+
+@app.route('/healthz')
+def healthz():
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readyz():
+    if not _ready.is_set():
+        return jsonify({"status": "starting"}), 503
+    catalog = recommender.catalog
+    return jsonify({"status": "ready", "catalog_version": catalog.version, "jobs": len(catalog.data_handler.live_positions)})
+
+@app.route('/metrics')
+def metrics_route():
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled."}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -41,12 +156,88 @@ def recommend():
         request_data = request.get_json()
         if not request_data:
             return jsonify({"error": "Invalid JSON payload"}), 400
+        # `limit` and/or `cursor` ask for a page object instead of the top-5 list.
+        if 'limit' in request_data or 'cursor' in request_data:
+            try:
+                limit = int(request_data.get('limit') or 5)
+            except (TypeError, ValueError):
+                return jsonify({"error": "'limit' must be an integer."}), 400
+            try:
+                page = recommender.get_recommendation_page(request_data, limit=limit, cursor=request_data.get('cursor'))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify(page)
         recommendations = recommender.get_recommendations(request_data)
         return jsonify(recommendations)
     except Exception as e:
         print(f"An error occurred in /recommend: {e}", flush=True)
         return jsonify({"error": "An internal server error occurred."}), 500
 
+@app.route('/recommend/batch', methods=['POST'])
+def recommend_batch():
+    try:
+        top_k = int(request.args.get('top_k', 5))
+    except ValueError:
+        return jsonify({"error": "'top_k' must be an integer."}), 400
+    if top_k < 1:
+        return jsonify({"error": "top_k must be at least 1."}), 400
+    with_stories = request.args.get('stories', default='false').lower() in ('1', 'true', 'yes')
+    if request.mimetype == 'application/x-ndjson':
+        items = (line for line in request.stream if line.strip())
+    else:
+        payload = request.get_json(silent=True)
+        items = payload.get('requests') if isinstance(payload, dict) else payload
+        if not isinstance(items, list):
+            return jsonify({"error": "Expected NDJSON or a JSON list of preference objects."}), 400
+    return Response(
+        stream_with_context(stream_ndjson(recommender, items, top_k=top_k, with_stories=with_stories)),
+        mimetype='application/x-ndjson'
+    )
+
+def _is_admin():
+    return bool(ADMIN_TOKEN) and request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+@app.route('/admin/catalog', methods=['POST'])
+def update_catalog():
+    """Adds, updates (by job_id) or deletes jobs without a restart.
+
+    Accepts JSON `{"upsert": [job, ...], "delete": [job_id, ...]}` or a
+    `text/csv` body of jobs.csv rows to upsert (`?delete=` ids may be added).
+    With the change log on, other workers pick the change up within
+    CATALOG_CHANGES_POLL_SECONDS and it is replayed after restarts.
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        if request.mimetype == 'text/csv':
+            import pandas as pd
+            upserts = pd.read_csv(io.BytesIO(request.get_data()))
+            deleted_ids = request.args.getlist('delete')
+        else:
+            payload = request.get_json(silent=True)
+            if not isinstance(payload, dict):
+                return jsonify({"error": "Expected a JSON object with 'upsert' and/or 'delete'."}), 400
+            upserts = payload.get('upsert') or None
+            deleted_ids = payload.get('delete') or ()
+        return jsonify(recommender.update_catalog(upserts, deleted_ids))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"An error occurred in /admin/catalog: {e}", flush=True)
+        return jsonify({"error": "An internal server error occurred."}), 500
+
+@app.route('/admin/catalog/reload', methods=['POST'])
+def reload_catalog():
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        return jsonify(recommender.reload_catalog())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        print(f"An error occurred in /admin/catalog/reload: {e}", flush=True)
+        return jsonify({"error": "An internal server error occurred."}), 500
+
 @app.route('/parse_resume', methods=['POST'])
 def parse_resume_route():
     if 'resume' not in request.files:
@@ -54,6 +245,9 @@ def parse_resume_route():
     file = request.files['resume']
     if file.filename == '':
         return jsonify({"error": "No selected file."}), 400
+    # ?async=1 queues the file and returns a job id to poll instead of waiting for the LLM.
+    if request.args.get('async'):
+        return enqueue_resume(file)
     try:
         extracted_data = resume_parser.parse(file)
         return jsonify(extracted_data)
@@ -61,6 +255,23 @@ def parse_resume_route():
         print(f"An error occurred in /parse_resume: {e}")
         return jsonify({"error": "Failed to parse the resume."}), 500
 
+def enqueue_resume(file):
+    data = file.read(resume_parser.max_bytes + 1)
+    if resume_parser.too_large(data):
+        return jsonify({"error": f"The resume is larger than {resume_parser.max_bytes // (1024 * 1024)} MB."}), 413
+    job_id = resume_queue.submit(data)
+    if job_id is None:
+        retry_after = resume_queue.retry_after()
+        return jsonify({"error": "Too many resumes are being processed; try again shortly."}), 429, {'Retry-After': str(retry_after)}
+    return jsonify({"job_id": job_id, "status": "queued"}), 202, {'Location': f"/parse_resume/{job_id}"}
+
+@app.route('/parse_resume/<job_id>')
+def resume_job_status(job_id):
+    job = resume_queue.status(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job."}), 404
+    return jsonify({"job_id": job_id, **job})
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
 
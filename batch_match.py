@@ -0,0 +1,109 @@
+# file: batch_match.py
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+LIST_PREFERENCES = ('skills', 'titles', 'locations', 'industries')
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _parse_item(item):
+    if isinstance(item, (bytes, str)):
+        item = json.loads(item)
+    if not isinstance(item, dict):
+        raise ValueError("each entry must be a JSON object with 'preferences' and 'weights'")
+    # Checked here so one bad entry gets an error line instead of failing the whole block.
+    preferences = item.get('preferences', {})
+    if not isinstance(preferences, dict):
+        raise ValueError("'preferences' must be an object")
+    for key in LIST_PREFERENCES:
+        values = preferences.get(key, [])
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise ValueError(f"'preferences.{key}' must be a list of strings")
+    if preferences.get('min_salary') is not None and not _is_number(preferences['min_salary']):
+        raise ValueError("'preferences.min_salary' must be a number")
+    weights = item.get('weights', {})
+    if not isinstance(weights, dict) or not all(_is_number(weight) for weight in weights.values()):
+        raise ValueError("'weights' must be an object of numbers")
+    return item
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def stream_ndjson(recommender, items, top_k=5, with_stories=False, block_size=256):
+    """Yields one NDJSON line per input item with its top-k recommendations.
+
+    `items` may be NDJSON lines or already-parsed preference objects. An
+    optional "id" field is echoed back; entries that fail to parse or are
+    malformed produce an "error" line instead of stopping the stream.
+    """
+    errors = {}
+    ids = {}
+
+    def parsed_items():
+        for index, item in enumerate(items):
+            try:
+                preferences = _parse_item(item)
+            except ValueError as e:
+                errors[index] = str(e)
+                preferences = {}
+            ids[index] = preferences.get('id')
+            yield preferences
+
+    results = recommender.get_batch_recommendations(parsed_items(), top_k=top_k, with_stories=with_stories, block_size=block_size)
+    for index, recommendations in enumerate(results):
+        record = {"index": index, "id": ids.pop(index)}
+        if index in errors:
+            record["error"] = errors.pop(index)
+        else:
+            record["recommendations"] = recommendations
+        yield json.dumps(record, default=str) + "\n"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Match many candidate profiles against the job catalog.")
+    parser.add_argument('input', help="NDJSON file of {'preferences': ..., 'weights': ...} objects, or '-' for stdin.")
+    parser.add_argument('-o', '--output', default='-', help="Where to write NDJSON results (default: stdout).")
+    parser.add_argument('--jobs', default=os.path.join('data', 'jobs.csv'), help="Job catalog CSV.")
+    parser.add_argument('--top-k', type=positive_int, default=5)
+    parser.add_argument('--block-size', type=positive_int, default=256, help="Candidates encoded and scored per block.")
+    parser.add_argument('--stories', action='store_true', help="Generate Match Stories (off by default).")
+    parser.add_argument('--api-key', default=os.environ.get('GEMINI_API_KEY', "YOUR_API_KEY_HERE"))
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    start = time.perf_counter()
+    count = 0
+    # Progress and warning prints go to stderr so stdout stays pure NDJSON.
+    with contextlib.redirect_stdout(sys.stderr):
+        from matching_engine import Recommender
+        if args.stories and args.api_key != "YOUR_API_KEY_HERE":
+            import google.generativeai as genai
+            genai.configure(api_key=args.api_key)
+
+        recommender = Recommender(args.jobs, api_key=args.api_key)
+        try:
+            lines = (line for line in source if line.strip())
+            for line in stream_ndjson(recommender, lines, top_k=args.top_k, with_stories=args.stories, block_size=args.block_size):
+                sink.write(line)
+                count += 1
+        finally:
+            if args.input != '-':
+                source.close()
+            if args.output != '-':
+                sink.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Matched {count} candidates in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f}/s).", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
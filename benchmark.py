@@ -0,0 +1,425 @@
+# file: benchmark.py
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+RESULTS_DIR = os.path.join('data', 'benchmarks')
+CATALOG_DIR = os.path.join(RESULTS_DIR, 'catalogs')
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+def _latency_summary(seconds):
+    if not seconds:
+        return {}
+    ms = np.array(seconds) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+def _catalog_path(size, seed):
+    from data.generate_data import generate_jobs
+    path = os.path.join(CATALOG_DIR, f"jobs_{size}_seed{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(CATALOG_DIR, exist_ok=True)
+        generate_jobs(size, seed=seed).to_csv(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+    return path
+
+def _use_stub_encoder(encode_delay=0.0):
+    from fake_encoder import FakeSentenceEncoder
+    from semantic_matcher import SemanticMatcher
+    encoder = FakeSentenceEncoder(call_delay=encode_delay)
+    SemanticMatcher.model_factory = encoder
+    # Encode everything from scratch, and never mix stub vectors into the real cache.
+    SemanticMatcher.CACHE_DIR = ''
+    return encoder
+
+def _run_concurrent(recommender, candidates, users):
+    """Recommends for `candidates` from `users` threads; returns throughput and latency."""
+    def timed(candidate):
+        start = time.perf_counter()
+        recommender.get_recommendations(candidate)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        latencies = list(executor.map(timed, candidates))
+    elapsed = time.perf_counter() - start
+    return {"users": users, "requests_per_s": round(len(candidates) / elapsed, 1), "latency": _latency_summary(latencies)}
+
+def run_catalog(size, seed, queries, llm_delay, concurrency=0, encode_delay=0.0):
+    """Benchmarks one catalog size in the current process."""
+    from data.generate_data import generate_candidates
+    from fake_genai import FakeGenerativeModel
+    encoder = _use_stub_encoder(encode_delay)
+    from matching_engine import Recommender
+    from story_generator import StoryGenerator
+
+    jobs_path = _catalog_path(size, seed)
+    if os.path.exists(jobs_path + '.npz'):
+        os.remove(jobs_path + '.npz')
+
+    def new_recommender():
+        story_generator = StoryGenerator(api_key=None, model_factory=FakeGenerativeModel(delay=llm_delay))
+        return Recommender(jobs_path, api_key=None, story_generator=story_generator)
+
+    start = time.perf_counter()
+    recommender = new_recommender()
+    construct_cold = time.perf_counter() - start
+    construct_encodes = {"calls": encoder.calls, "texts": encoder.texts_encoded}
+
+    candidates = generate_candidates(queries, seed=seed + 1)
+    calls_before, texts_before = encoder.calls, encoder.texts_encoded
+    latencies = []
+    results = 0
+    for candidate in candidates:
+        start = time.perf_counter()
+        results += len(recommender.get_recommendations(candidate))
+        latencies.append(time.perf_counter() - start)
+    query_encodes = {"calls": encoder.calls - calls_before, "texts": encoder.texts_encoded - texts_before}
+
+    repeat_latencies = []
+    for candidate in candidates[:min(len(candidates), 100)]:
+        start = time.perf_counter()
+        recommender.get_recommendations(candidate)
+        repeat_latencies.append(time.perf_counter() - start)
+    concurrent = None
+    if concurrency:
+        # Fresh profiles, so the per-profile score cache does not hide the encodes.
+        calls_before = encoder.calls
+        concurrent = _run_concurrent(recommender, generate_candidates(queries, seed=seed + 2), concurrency)
+        concurrent["encode_calls"] = encoder.calls - calls_before
+    peak_rss = _peak_rss_mb()
+
+    # The second construction reads the .npz catalog cache written by the first.
+    del recommender
+    start = time.perf_counter()
+    new_recommender()
+    construct_warm = time.perf_counter() - start
+
+    return {
+        "jobs": size,
+        "construct_cold_s": round(construct_cold, 3),
+        "construct_warm_s": round(construct_warm, 3),
+        "construct_encode": construct_encodes,
+        "recommend": _latency_summary(latencies),
+        "recommend_repeat": _latency_summary(repeat_latencies),
+        "recommend_encode": query_encodes,
+        "recommend_concurrent": concurrent,
+        "mean_results": round(results / len(candidates), 2) if candidates else 0,
+        "peak_rss_mb": peak_rss,
+    }
+
+def run_resume_parser(count, seed, llm_delay):
+    """Benchmarks PDF text extraction and full parsing on generated resumes."""
+    import random
+    from fake_genai import FakeGenerativeModel
+    from resume_parser import ResumeParser, fitz
+    from data.generate_data import ROLES, LOCATIONS
+    if fitz is None:
+        return {"skipped": "PyMuPDF (fitz) is not installed"}
+
+    rng = random.Random(seed)
+    pdfs = []
+    for i in range(count):
+        role_name, role_info = rng.choice(list(ROLES.items()))
+        doc = fitz.open()
+        for page_number in range(rng.randint(1, 3)):
+            page = doc.new_page()
+            lines = [f"Candidate {i} - {role_name}", f"Location: {rng.choice(LOCATIONS)}", "Skills: " + ", ".join(role_info['skills'])]
+            lines += [f"Experience item {n}: built and shipped {rng.choice(role_info['skills'])} systems." for n in range(30)]
+            page.insert_text((50, 60), "\n".join(lines), fontsize=9)
+        pdfs.append(doc.tobytes())
+        doc.close()
+
+    response = json.dumps({"skills": ["Python"], "titles": ["Software Engineer"], "locations": [], "industries": []})
+    parser = ResumeParser(api_key=None, model_factory=FakeGenerativeModel(delay=llm_delay, response=response))
+    extract, parse, repeat = [], [], []
+    for pdf in pdfs:
+        start = time.perf_counter()
+        parser._extract_text_from_pdf(pdf)
+        extract.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        parser.parse(io.BytesIO(pdf))
+        parse.append(time.perf_counter() - start)
+    # Re-uploads of the same files are answered from the parsed-resume cache.
+    for pdf in pdfs:
+        start = time.perf_counter()
+        parser.parse(io.BytesIO(pdf))
+        repeat.append(time.perf_counter() - start)
+    return {"resumes": count, "extract": _latency_summary(extract), "parse": _latency_summary(parse),
+            "parse_repeat": _latency_summary(repeat), "cache": parser.cache_stats(), "peak_rss_mb": _peak_rss_mb()}
+
+def run_encoder_backend(size, seed, queries, backend):
+    """Encode speed and each query's top-5 job ids with one real encoder backend."""
+    from data.generate_data import generate_candidates
+    from fake_genai import FakeGenerativeModel
+    from semantic_matcher import SemanticMatcher
+    SemanticMatcher.BACKEND = backend
+    # Every backend encodes from scratch; their vectors must not meet in one cache.
+    SemanticMatcher.CACHE_DIR = ''
+    from matching_engine import Recommender
+    from story_generator import StoryGenerator
+
+    start = time.perf_counter()
+    matcher = SemanticMatcher()
+    load_s = time.perf_counter() - start
+    if not matcher.warm_up():
+        return {"backend": backend, "error": "the sentence-transformers model could not be loaded"}
+    candidates = generate_candidates(queries, seed=seed + 1)
+
+    # Request-time encodes: a candidate's skills, then its first title.
+    query_latencies = []
+    for candidate in candidates:
+        preferences = candidate['preferences']
+        for texts in (preferences.get('skills', []), preferences.get('titles', [])[:1]):
+            if texts:
+                start = time.perf_counter()
+                matcher._run_model(texts)
+                query_latencies.append(time.perf_counter() - start)
+
+    recommender = Recommender(_catalog_path(size, seed), api_key=None,
+                              story_generator=StoryGenerator(api_key=None, model_factory=FakeGenerativeModel()))
+    # Catalog indexing: the whole title and skill vocabulary in one call.
+    job_index = recommender.catalog.job_index
+    vocabulary = list(job_index.title_vocab) + list(job_index.skill_vocab)
+    start = time.perf_counter()
+    matcher._run_model(vocabulary)
+    bulk_s = time.perf_counter() - start
+
+    torch = sys.modules.get('torch')
+    return {
+        "backend": backend,
+        "threads": torch.get_num_threads() if torch is not None else None,
+        "load_s": round(load_s, 3),
+        "query_encode": _latency_summary(query_latencies),
+        "bulk_texts_per_s": round(len(vocabulary) / bulk_s, 1) if bulk_s else None,
+        "top5": [[job['job_id'] for job in recommender._recommend(candidate, top_k=5, with_stories=False)] for candidate in candidates],
+    }
+
+def _top5_agreement(reference, other):
+    """Mean top-5 overlap and share of identical top-5 lists between two runs over the same queries."""
+    overlaps = [len(set(a) & set(b)) / max(len(a), len(b)) if (a or b) else 1.0 for a, b in zip(reference, other)]
+    same = [a == b for a, b in zip(reference, other)]
+    return {"top5_overlap": round(float(np.mean(overlaps)), 4) if overlaps else None,
+            "same_top5_order": round(float(np.mean(same)), 4) if same else None}
+
+def compare_backends(args):
+    """Runs each backend in its own process and reports speed and agreement with the first."""
+    entries = []
+    for size in args.sizes:
+        runs = []
+        for backend in args.backends:
+            print(f"Encoding with {backend} for {size} jobs...", file=sys.stderr)
+            runs.append(_run_child(args, f"encoder:{backend}:{size}"))
+        reference = runs[0]
+        for run in runs:
+            if 'top5' not in run or 'top5' not in reference:
+                continue
+            run.update(_top5_agreement(reference['top5'], run['top5']))
+            if run.get('bulk_texts_per_s') and reference.get('bulk_texts_per_s'):
+                run["bulk_speedup"] = round(run['bulk_texts_per_s'] / reference['bulk_texts_per_s'], 2)
+            if run['query_encode'] and reference['query_encode']:
+                run["query_p50_speedup"] = round(reference['query_encode']['p50_ms'] / run['query_encode']['p50_ms'], 2)
+        for run in runs:
+            run.pop('top5', None)
+        entry = {"jobs": size, "backends": runs}
+        print(json.dumps(entry), file=sys.stderr)
+        entries.append(entry)
+    return entries
+
+def _recall_at_k(exact, approximate):
+    """Mean share of each exact top-k list that the approximate run also returned."""
+    recalls = [len(set(a) & set(e)) / len(e) for e, a in zip(exact, approximate) if e]
+    return round(float(np.mean(recalls)), 4) if recalls else None
+
+def run_ann(size, seed, queries, candidate_counts, nprobes):
+    """Recall@5 and latency of two-stage (ANN) ranking against exact scoring on one catalog."""
+    from data.generate_data import generate_candidates
+    from fake_genai import FakeGenerativeModel
+    _use_stub_encoder()
+    from candidate_retrieval import CandidateRetriever
+    from matching_engine import Recommender
+    from story_generator import StoryGenerator
+
+    recommender = Recommender(_catalog_path(size, seed), api_key=None, ann_candidates=0,
+                              story_generator=StoryGenerator(api_key=None, model_factory=FakeGenerativeModel()))
+    candidates = generate_candidates(queries, seed=seed + 1)
+
+    def ranked():
+        top, latencies = [], []
+        for candidate in candidates:
+            start = time.perf_counter()
+            top.append([job['job_id'] for job in recommender._recommend(candidate, top_k=5, with_stories=False, use_cache=False)])
+            latencies.append(time.perf_counter() - start)
+        return top, _latency_summary(latencies)
+
+    exact, exact_latency = ranked()
+    retriever = CandidateRetriever(min_jobs=0, nlist=int(os.environ['ANN_NLIST']) if os.environ.get('ANN_NLIST') else None)
+    start = time.perf_counter()
+    index = retriever.publish(recommender.catalog)
+    build_s = time.perf_counter() - start
+    recommender.candidate_retriever = retriever
+
+    settings = []
+    for count in candidate_counts:
+        for nprobe in nprobes:
+            retriever.candidates, retriever.nprobe = count, nprobe
+            top, latency = ranked()
+            settings.append({"candidates": count, "nprobe": nprobe, "recall_at_5": _recall_at_k(exact, top), "recommend": latency})
+    return {"jobs": size, "profiles": index.profiles, "nlist": len(index.centroids), "build_s": round(build_s, 3),
+            "exact": exact_latency, "ann": settings, "peak_rss_mb": _peak_rss_mb()}
+
+def _git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _run_child(args, child):
+    # Each measurement runs in a fresh interpreter so peak RSS and caches are per size.
+    command = [sys.executable, os.path.abspath(__file__), '--child', child, '--seed', str(args.seed),
+               '--queries', str(args.queries), '--resumes', str(args.resumes), '--llm-delay', str(args.llm_delay),
+               '--concurrency', str(args.concurrency), '--encode-delay', str(args.encode_delay)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(completed.stderr, file=sys.stderr)
+        return {"error": f"benchmark process exited with {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def compare(old_path, new_path):
+    """Prints the change of each latency/time metric between two result files."""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    old_sizes = {entry.get('jobs'): entry for entry in old['catalogs']}
+    for entry in new['catalogs']:
+        before = old_sizes.get(entry.get('jobs'))
+        if before is None:
+            continue
+        print(f"\n{entry['jobs']} jobs")
+        for label, path in [("construct cold s", ('construct_cold_s',)), ("construct warm s", ('construct_warm_s',)),
+                            ("recommend p50 ms", ('recommend', 'p50_ms')), ("recommend p95 ms", ('recommend', 'p95_ms')),
+                            ("recommend p99 ms", ('recommend', 'p99_ms')),
+                            ("concurrent req/s", ('recommend_concurrent', 'requests_per_s')),
+                            ("concurrent p95 ms", ('recommend_concurrent', 'latency', 'p95_ms')), ("peak RSS MB", ('peak_rss_mb',))]:
+            a, b = before, entry
+            for key in path:
+                a, b = (a or {}).get(key), (b or {}).get(key)
+            if a and b is not None:
+                print(f"  {label:<18} {a:>10} -> {b:<10} ({(b - a) / a * 100:+.1f}%)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the matching pipeline offline with a stub encoder and LLM.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Catalog sizes to benchmark.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for generated catalogs and candidates.")
+    parser.add_argument('--queries', type=int, default=500, help="Candidate profiles to recommend per size.")
+    parser.add_argument('--resumes', type=int, default=20, help="Generated resume PDFs to parse (needs PyMuPDF).")
+    parser.add_argument('--llm-delay', type=float, default=0.0, help="Seconds each stub LLM call sleeps.")
+    parser.add_argument('--concurrency', type=int, default=0, help="Also measure throughput with this many concurrent users.")
+    parser.add_argument('--encode-delay', type=float, default=0.0, help="Seconds each stub encoder call sleeps (a forward pass's fixed cost).")
+    parser.add_argument('--backends', nargs='+', metavar='BACKEND', help="Instead of the pipeline benchmark, compare these encoder backends "
+                        "(e.g. float32 int8) with the real model: encode speed and top-5 agreement with the first one.")
+    parser.add_argument('--ann', type=int, nargs='+', metavar='CANDIDATES', help="Instead of the pipeline benchmark, measure two-stage "
+                        "ranking's recall@5 and latency against exact scoring for each of these candidate counts.")
+    parser.add_argument('--ann-nprobe', type=int, nargs='+', default=[1, 8, 32], help="Minimum clusters probed, for each --ann count (default: 1 8 32).")
+    parser.add_argument('-o', '--output', help=f"Results JSON path (default: {RESULTS_DIR}/<commit>-<time>.json).")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Compare two results files instead of running.")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.child:
+        # Progress prints go to stderr; stdout carries only the result line.
+        with contextlib.redirect_stdout(sys.stderr):
+            if args.child == 'resume':
+                result = run_resume_parser(args.resumes, args.seed, args.llm_delay)
+            elif args.child.startswith('ann:'):
+                _, size, counts, nprobes = args.child.split(':')
+                result = run_ann(int(size), args.seed, args.queries, [int(c) for c in counts.split(',')], [int(n) for n in nprobes.split(',')])
+            elif args.child.startswith('encoder:'):
+                _, backend, size = args.child.split(':')
+                result = run_encoder_backend(int(size), args.seed, args.queries, backend)
+            else:
+                result = run_catalog(int(args.child), args.seed, args.queries, args.llm_delay, args.concurrency, args.encode_delay)
+        print(json.dumps(result))
+        return
+
+    started = datetime.now(timezone.utc)
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": started.isoformat(timespec='seconds'),
+            "seed": args.seed,
+            "queries": args.queries,
+            "llm_delay_s": args.llm_delay,
+            "concurrency": args.concurrency,
+            "encode_delay_s": args.encode_delay,
+            "encode_batch_window_ms": float(os.environ.get('ENCODE_BATCH_WINDOW_MS', '0')),
+            "scoring_workers": int(os.environ.get('SCORING_WORKERS', '0')),
+            "encoder_threads": int(os.environ.get('ENCODER_THREADS', '0')),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "catalogs": [],
+    }
+    if args.backends:
+        results["encoders"] = compare_backends(args)
+    elif args.ann:
+        results["ann"] = []
+        for size in args.sizes:
+            print(f"Measuring two-stage ranking on {size} jobs...", file=sys.stderr)
+            entry = _run_child(args, f"ann:{size}:{','.join(map(str, args.ann))}:{','.join(map(str, args.ann_nprobe))}")
+            results["ann"].append(entry)
+            print(json.dumps(entry), file=sys.stderr)
+    else:
+        for size in args.sizes:
+            print(f"Benchmarking {size} jobs...", file=sys.stderr)
+            entry = _run_child(args, str(size))
+            entry.setdefault('jobs', size)
+            results["catalogs"].append(entry)
+            print(json.dumps(entry), file=sys.stderr)
+        if args.resumes:
+            results["resume_parser"] = _run_child(args, 'resume')
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['meta']['commit'] or 'unknown'}-{started:%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# file: caching.py
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from sqlite_connection import ProcessLocalConnection
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with an optional time-to-live.
+
+    With `max_weight`, entries are also evicted while the total of
+    `weigh(value)` over all entries exceeds it; a value heavier than
+    `max_weight` on its own is not cached.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, max_weight=None, weigh=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        weight = self.weigh(value) if self.max_weight is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_weight is not None and weight > self.max_weight:
+                return
+            self._entries[key] = (value, time.monotonic(), weight)
+            self.weight += weight
+            while len(self._entries) > self.max_size or (self.max_weight is not None and self.weight > self.max_weight):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        # Called with the lock held.
+        self.weight -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteLRUCache:
+    """LRU cache of JSON-serializable values persisted in a SQLite file.
+
+    Shares `LRUCache`'s get/put interface so callers can swap one for the
+    other. Entries past `max_size` are evicted least-recently-used first.
+    """
+
+    def __init__(self, path, max_size=10000, table='cache'):
+        self.path = path
+        self.max_size = max_size
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = ProcessLocalConnection(path)
+        with self._lock:
+            conn = self._conn.get()
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)'
+            )
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)')
+
+    def get(self, key, default=None):
+        with self._lock:
+            conn = self._conn.get()
+            row = conn.execute(f'SELECT value FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            conn.execute(f'UPDATE {self.table} SET last_used = ? WHERE key = ?', (time.time(), key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, value):
+        with self._lock:
+            conn = self._conn.get()
+            conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, last_used) VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time())
+            )
+            conn.execute(
+                f'DELETE FROM {self.table} WHERE key IN '
+                f'(SELECT key FROM {self.table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (self.max_size,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.get().execute(f'DELETE FROM {self.table}')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.get().execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
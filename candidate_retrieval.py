@@ -0,0 +1,141 @@
+# file: candidate_retrieval.py
+
+import math
+import threading
+import weakref
+import numpy as np
+from job_index import skill_set_segments
+
+def _normalize(vectors):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+def _spherical_kmeans(vectors, clusters, iterations, rng):
+    """Unit-length centroids of `clusters` groups of the unit rows of `vectors`."""
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)]
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        # Re-seed clusters that lost all their members.
+        empty = np.flatnonzero(~sums.any(axis=1))
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty))]
+        centroids = _normalize(sums)
+    return centroids
+
+class ProfileIVFIndex:
+    """IVF-style index of a catalog's jobs by title and skills.
+
+    Jobs with the same title and skill set share a profile, whose vector
+    is [title vector, normalized mean of its skill vectors]. Profiles are
+    grouped into `nlist` clusters by spherical k-means over a sample (or
+    assigned to given `centroids`), and job positions are stored by cluster,
+    CSR-style (`cluster_offsets` + `cluster_jobs`).
+    """
+
+    BLOCK_SIZE = 8192
+
+    def __init__(self, job_index, nlist=None, centroids=None, sample_size=20000, iterations=10, seed=0):
+        self.available = job_index.title_vectors is not None and job_index.skill_vectors is not None
+        if not self.available:
+            return
+        set_count = len(job_index.skill_set_sizes)
+        profiles, job_profiles = np.unique(job_index.title_ids.astype(np.int64) * set_count + job_index.skill_set_ids, return_inverse=True)
+        profile_titles, profile_sets = profiles // set_count, profiles % set_count
+
+        if centroids is None:
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(len(profiles), min(len(profiles), sample_size), replace=False))
+            if nlist is None:
+                nlist = int(round(4 * math.sqrt(len(profiles))))
+            nlist = max(1, min(nlist, len(sample)))
+            centroids = _spherical_kmeans(self._profile_vectors(job_index, profile_titles[sample], profile_sets[sample]), nlist, iterations, rng)
+        self.centroids = centroids
+
+        profile_clusters = np.empty(len(profiles), dtype=np.int32)
+        for start in range(0, len(profiles), self.BLOCK_SIZE):
+            block = slice(start, start + self.BLOCK_SIZE)
+            vectors = self._profile_vectors(job_index, profile_titles[block], profile_sets[block])
+            profile_clusters[block] = np.argmax(vectors @ centroids.T, axis=1)
+
+        job_clusters = profile_clusters[job_profiles.reshape(-1)]
+        self.cluster_jobs = np.argsort(job_clusters, kind='stable').astype(np.int64)
+        self.cluster_offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(job_clusters, minlength=len(centroids)), out=self.cluster_offsets[1:])
+        self.profiles = len(profiles)
+
+    @staticmethod
+    def _profile_vectors(job_index, titles, sets):
+        title_vectors = job_index.title_vectors[titles] * job_index._title_present[titles, None]
+        skill_vectors = np.zeros((len(sets), job_index.skill_vectors.shape[1]), dtype=np.float32)
+        present = job_index.skill_set_sizes[sets] > 0
+        if present.any():
+            members, starts = skill_set_segments(job_index.skill_set_offsets, job_index.skill_set_sizes, job_index.skill_set_members, sets)
+            skill_vectors[present] = np.add.reduceat(job_index.skill_vectors[members], starts)
+        return _normalize(np.hstack((title_vectors, _normalize(skill_vectors))).astype(np.float32))
+
+    def search(self, query, allowed, nprobe, min_candidates):
+        """Sorted positions of allowed jobs in the clusters nearest to `query`.
+
+        Clusters are taken best first until at least `nprobe` are probed
+        and at least `min_candidates` jobs are gathered (or none are left).
+        """
+        parts, found = [], 0
+        for probed, cluster in enumerate(np.argsort(-(self.centroids @ query), kind='stable'), 1):
+            jobs = self.cluster_jobs[self.cluster_offsets[cluster]:self.cluster_offsets[cluster + 1]]
+            jobs = jobs[allowed[jobs]]
+            parts.append(jobs)
+            found += len(jobs)
+            if probed >= nprobe and found >= min_candidates:
+                break
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+class CandidateRetriever:
+    """First stage of two-stage ranking for large catalogs.
+
+    Finds the jobs whose title and skills are nearest the candidate's in a
+    `ProfileIVFIndex`; `Recommender` then scores only those with the full
+    weighted rules. `candidates` (jobs to gather) and `nprobe` (clusters
+    to probe at least) trade recall for latency; `nlist` sets the number of
+    clusters. Catalogs under `min_jobs` are scored exactly.
+
+    Each catalog version gets its own index. Later versions reuse the
+    first index's centroids and only assign their jobs to them.
+    """
+
+    def __init__(self, candidates=5000, nprobe=16, nlist=None, min_jobs=100000):
+        self.candidates = candidates
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.min_jobs = min_jobs
+        self._lock = threading.Lock()
+        self._centroids = None
+        self._published = weakref.WeakKeyDictionary()
+
+    def covers(self, catalog):
+        return len(catalog.data_handler.live) >= self.min_jobs
+
+    def publish(self, catalog):
+        """Builds `catalog`'s index, if not done already."""
+        with self._lock:
+            index = self._published.get(catalog)
+            if index is None:
+                centroids = self._centroids
+                if centroids is not None and catalog.job_index.skill_vectors is not None and centroids.shape[1] != 2 * catalog.job_index.skill_vectors.shape[1]:
+                    centroids = None
+                index = self._published[catalog] = ProfileIVFIndex(catalog.job_index, nlist=self.nlist, centroids=centroids)
+                if index.available:
+                    self._centroids = index.centroids
+            return index
+
+    def retrieve(self, catalog, skill_vectors, title_vectors, weights, allowed):
+        """Candidate positions for the query, or None when it has no title or skills to search by."""
+        index = self.publish(catalog)
+        if not index.available:
+            return None
+        dim = index.centroids.shape[1] // 2
+        title_part = title_vectors[0] if len(title_vectors) else np.zeros(dim, dtype=np.float32)
+        skill_part = _normalize(skill_vectors.sum(axis=0)) if len(skill_vectors) else np.zeros(dim, dtype=np.float32)
+        query = np.concatenate((weights.get('title', 0) * title_part, weights.get('skills', 0) * skill_part))
+        if not query.any():
+            return None
+        return index.search(query.astype(np.float32), allowed, self.nprobe, self.candidates)
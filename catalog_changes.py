@@ -0,0 +1,61 @@
+# file: catalog_changes.py
+
+import json
+import threading
+from contextlib import contextmanager
+from sqlite_connection import ProcessLocalConnection
+
+class CatalogChangeLog:
+    """Ordered log of admin catalog changes in a SQLite file.
+
+    Every gunicorn worker reads the same file, so a change accepted by one
+    worker reaches the others: each applies `since(seq)` in log order. Each
+    change is stored as `(upserts, deleted_ids)`, upserts as a list of job
+    dicts; `seq` numbers only ever grow.
+    """
+
+    def __init__(self, path, timeout=60.0):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = ProcessLocalConnection(path, timeout=timeout)
+        with self._lock:
+            self._conn.get().execute(
+                'CREATE TABLE IF NOT EXISTS catalog_changes '
+                '(seq INTEGER PRIMARY KEY AUTOINCREMENT, upserts TEXT NOT NULL, deleted TEXT NOT NULL)'
+            )
+
+    def since(self, seq):
+        """[(seq, upserts, deleted_ids), ...] for the changes after `seq`, oldest first."""
+        with self._lock:
+            rows = self._conn.get().execute(
+                'SELECT seq, upserts, deleted FROM catalog_changes WHERE seq > ? ORDER BY seq', (seq,)
+            ).fetchall()
+        return [(row[0], json.loads(row[1]), json.loads(row[2])) for row in rows]
+
+    @contextmanager
+    def exclusive(self):
+        """Holds the log's write lock, across processes, for the duration of the block.
+
+        Inside it, no other writer can append, so a worker can catch up with
+        `since`, check its own change and `append` it knowing it lands right
+        after what it has applied. Appends are committed when the block exits
+        without an exception and rolled back otherwise.
+        """
+        with self._lock:
+            conn = self._conn.get()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def append(self, upserts, deleted_ids):
+        """Adds a change; returns its seq. Call it inside `exclusive`."""
+        with self._lock:
+            cursor = self._conn.get().execute(
+                'INSERT INTO catalog_changes (upserts, deleted) VALUES (?, ?)',
+                (json.dumps(upserts), json.dumps(list(deleted_ids)))
+            )
+            return cursor.lastrowid
@@ -1,4 +1,6 @@
 # file: generate_data.py
+import argparse
+import json
 import pandas as pd
 import random
 import numpy as np
@@ -76,35 +78,45 @@ INDUSTRIES = ["IT Services & Consulting", "FinTech", "E-commerce", "SaaS", "Heal
 COMPANY_SIZES = ["51-200 Employees", "201-500 Employees", "501-1000 Employees", "1001-5000 Employees", "5001-10000 Employees", "10000+ Employees"]
 VALUES = ["Innovation", "Work-Life Balance", "Customer Centricity", "Teamwork", "Integrity", "Continuous Learning", "Ownership", "Data-Driven Decisions"]
 
+# Candidate-only pools, so generated profiles also exercise unknown skills and titles.
+EXTRA_SKILLS = ["Go", "Rust", "GraphQL", "Redis", "Kafka", "Tableau", "Power BI", "Figma", "Communication", "Leadership"]
+EXTRA_TITLES = ["Site Reliability Engineer", "Data Analyst", "Platform Engineer", "Product Engineer"]
+WEIGHT_CHOICES = [0, 10, 25, 50, 75, 100]
+
 # --- Generation Logic ---
-def generate_jobs():
+def generate_jobs(num_jobs=NUM_JOBS, seed=None):
+    """Generates `num_jobs` listings; the same `seed` always yields the same catalog."""
+    rng = random.Random(seed)
     jobs_list = []
     company_counters = {abbr: 0 for abbr in COMPANIES.values()}
+    companies = list(COMPANIES.items())
+    roles = list(ROLES.items())
+    levels = list(LEVELS.items())
 
-    for i in range(NUM_JOBS):
-        company_name, company_abbr = random.choice(list(COMPANIES.items()))
+    for i in range(num_jobs):
+        company_name, company_abbr = rng.choice(companies)
         
         job_id = f"{company_abbr}-{company_counters[company_abbr]}"
         company_counters[company_abbr] += 1
         
-        role_name, role_info = random.choice(list(ROLES.items()))
-        level_name, level_info = random.choice(list(LEVELS.items()))
+        role_name, role_info = rng.choice(roles)
+        level_name, level_info = rng.choice(levels)
         title = f"{level_name} {role_name}"
         
         base_salary = role_info['salary_base']
-        salary = base_salary * level_info['salary_multiplier'] * random.uniform(0.9, 1.1)
+        salary = base_salary * level_info['salary_multiplier'] * rng.uniform(0.9, 1.1)
         salary_min = int(salary)
-        salary_max = int(salary_min * random.uniform(1.4, 1.8))
+        salary_max = int(salary_min * rng.uniform(1.4, 1.8))
         salary_range = f"[{salary_min}, {salary_max}]"
         
-        num_skills = random.randint(3, 5)
-        skills = ";".join(random.sample(role_info['skills'], min(num_skills, len(role_info['skills']))))
+        num_skills = rng.randint(3, 5)
+        skills = ";".join(rng.sample(role_info['skills'], min(num_skills, len(role_info['skills']))))
 
-        location = random.choice(LOCATIONS)
-        industry = random.choice(INDUSTRIES)
-        company_size = random.choice(COMPANY_SIZES)
-        num_values = random.randint(1, 3)
-        promoted_values = ";".join(random.sample(VALUES, num_values))
+        location = rng.choice(LOCATIONS)
+        industry = rng.choice(INDUSTRIES)
+        company_size = rng.choice(COMPANY_SIZES)
+        num_values = rng.randint(1, 3)
+        promoted_values = ";".join(rng.sample(VALUES, num_values))
         
         jobs_list.append({
             "job_id": job_id,
@@ -123,19 +135,59 @@ def generate_jobs():
         
     return pd.DataFrame(jobs_list)
 
-if __name__ == "__main__":
-    print(f"Generating {NUM_JOBS} job listings...")
-    
-    # --- *** THE FIX IS HERE *** ---
-    # Get the directory name from the output file path
-    output_dir = os.path.dirname(OUTPUT_FILE)
-    
-    # Create the directory if it doesn't exist
-    if not os.path.exists(output_dir):
+def generate_candidates(num_candidates, seed=None):
+    """Generates `recommend`-style request payloads ({"id", "preferences", "weights"})."""
+    rng = random.Random(seed)
+    all_skills = sorted({skill for role in ROLES.values() for skill in role['skills']}) + EXTRA_SKILLS
+    all_titles = list(ROLES) + EXTRA_TITLES
+    candidates = []
+    for i in range(num_candidates):
+        role_name, role_info = rng.choice(list(ROLES.items()))
+        # Mostly skills from one role, plus a couple from anywhere.
+        skills = rng.sample(role_info['skills'], rng.randint(1, min(4, len(role_info['skills']))))
+        skills += [skill for skill in rng.sample(all_skills, rng.randint(0, 2)) if skill not in skills]
+        titles = [role_name] + rng.sample(all_titles, rng.randint(0, 1))
+        weights = {key: rng.choice(WEIGHT_CHOICES) for key in ["skills", "title", "location", "industry", "salary"]}
+        if not any(weights.values()):
+            weights["skills"] = 100
+        candidates.append({
+            "id": f"candidate-{i}",
+            "preferences": {
+                "skills": skills,
+                "titles": titles,
+                "locations": rng.sample(LOCATIONS, rng.randint(0, 2)),
+                "industries": rng.sample(INDUSTRIES, rng.randint(0, 2)),
+                "min_salary": rng.choice([0, 500000, 1000000, 2000000]),
+            },
+            "weights": weights,
+        })
+    return candidates
+
+def _ensure_parent_dir(path):
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
         print(f"Creating directory: {output_dir}")
         os.makedirs(output_dir)
-    # --- *** END OF FIX *** ---
 
-    jobs_df = generate_jobs()
-    jobs_df.to_csv(OUTPUT_FILE, index=False)
-    print(f"Successfully created '{OUTPUT_FILE}' with {len(jobs_df)} jobs.")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic job catalog and candidate profiles.")
+    parser.add_argument('--jobs', type=int, default=NUM_JOBS, help="Number of job listings.")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed; the same seed gives the same output.")
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE, help="Job catalog CSV path.")
+    parser.add_argument('--candidates', type=int, default=0, help="Number of candidate profiles to generate.")
+    parser.add_argument('--candidates-output', default=os.path.join('data', 'candidates.ndjson'), help="Candidate NDJSON path.")
+    args = parser.parse_args()
+
+    print(f"Generating {args.jobs} job listings (seed {args.seed})...")
+    _ensure_parent_dir(args.output)
+    jobs_df = generate_jobs(args.jobs, seed=args.seed)
+    jobs_df.to_csv(args.output, index=False)
+    print(f"Successfully created '{args.output}' with {len(jobs_df)} jobs.")
+
+    if args.candidates:
+        _ensure_parent_dir(args.candidates_output)
+        # Offset the seed so candidates do not mirror the job draws.
+        with open(args.candidates_output, 'w', encoding='utf-8') as f:
+            for candidate in generate_candidates(args.candidates, seed=args.seed + 1):
+                f.write(json.dumps(candidate) + "\n")
+        print(f"Successfully created '{args.candidates_output}' with {args.candidates} candidate profiles.")
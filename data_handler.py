@@ -1,26 +1,184 @@
 # file: data_handler.py
 
+import copy
+import os
+import numpy as np
 import pandas as pd
-import json
+from job_store import JobStore
 
 class DataHandler:
-    def __init__(self, file_path):
+    def __init__(self, file_path, use_cache=True):
+        # Identifies the catalog contents; caches keyed on it never outlive a change.
+        self.version = 0
         try:
-            self.jobs_df = pd.read_csv(file_path)
-            self._preprocess_data()
+            self.jobs = self._load(file_path, use_cache)
         except FileNotFoundError:
             print(f"Error: The file at {file_path} was not found.")
-            self.jobs_df = pd.DataFrame()
-
-    def _preprocess_data(self):
-        for col in ['required_skills', 'values_promoted']:
-            self.jobs_df[col] = self.jobs_df[col].apply(
-                lambda x: [skill.strip() for skill in x.split(';')] if isinstance(x, str) else []
-            )
-        
-        self.jobs_df['salary_range'] = self.jobs_df['salary_range'].apply(
-            lambda x: json.loads(x) if isinstance(x, str) and x.startswith('[') else [0, 0]
-        )
+            self.jobs = JobStore.empty_store()
+        # Rows removed by `with_changes` stay in the store as tombstones until the next full load.
+        self.live = np.ones(len(self.jobs), dtype=bool)
+        self._build_indexes()
+
+    def _load(self, file_path, use_cache):
+        if file_path.endswith('.npz'):
+            jobs = JobStore.load(file_path)
+            if jobs is None:
+                raise FileNotFoundError(file_path)
+            return jobs
+
+        # A binary copy next to the CSV skips parsing on later starts; it is
+        # rebuilt whenever the CSV's size or modification time changes.
+        stat = os.stat(file_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cache_path = file_path + '.npz'
+        if use_cache:
+            jobs = JobStore.load(cache_path, expected_signature=signature)
+            if jobs is not None:
+                return jobs
+
+        jobs, report = JobStore.from_csv(file_path)
+        rate = report['rows'] / report['seconds'] if report['seconds'] else 0
+        print(f"Loaded {report['jobs']} jobs from {file_path} in {report['seconds']:.1f}s ({rate:,.0f} rows/s).")
+        if report['bad_rows']:
+            examples = "; ".join(f"line {line}: {reason}" for line, reason in report['errors'])
+            print(f"Skipped {report['bad_rows']} malformed rows in {file_path}. First ones: {examples}")
+        if use_cache:
+            try:
+                jobs.save(cache_path, source_signature=signature)
+            except OSError as e:
+                print(f"Could not write job catalog cache {cache_path}: {e}")
+        return jobs
+
+    def _build_indexes(self):
+        # Inverted indexes used by the recommender to pre-filter the catalog.
+        self.location_index = self._build_posting_lists('location')
+        self.industry_index = self._build_posting_lists('industry')
+        self.salary_max = self.jobs.salary_max
+        self.live_positions = np.arange(len(self.jobs))
+        self._position_of_code = None
+
+    def _build_posting_lists(self, col):
+        if col not in self.jobs.categorical:
+            return {}
+        codes, categories = self.jobs.categorical[col]
+        normalized_codes, values = pd.factorize(pd.Series(categories, dtype=object).str.lower().str.strip())
+        # Missing values (code -1) map to the sentinel appended at the end.
+        job_codes = np.append(normalized_codes, -1)[codes]
+        order = np.argsort(job_codes, kind='stable')
+        boundaries = np.searchsorted(job_codes[order], np.arange(len(values) + 1))
+        return {value: order[boundaries[code]:boundaries[code + 1]] for code, value in enumerate(values)}
+
+    def positions_for(self, index, normalized_values):
+        """Sorted positions of jobs whose indexed value is any of `normalized_values`."""
+        postings = [index[value] for value in set(normalized_values) if value in index]
+        if not postings:
+            return np.zeros(0, dtype=np.int64)
+        # Every job has a single value, so posting lists of distinct values are disjoint.
+        return postings[0] if len(postings) == 1 else np.sort(np.concatenate(postings))
+
+    def has_any(self, index, normalized_values, positions):
+        """Whether the job at each of `positions` has an indexed value among `normalized_values`.
+
+        Looks the positions up in the sorted posting lists, so the cost
+        follows len(positions) rather than the catalog size.
+        """
+        matched = np.zeros(len(positions), dtype=bool)
+        for value in set(normalized_values):
+            postings = index.get(value)
+            if postings is None or not len(postings):
+                continue
+            at = np.minimum(np.searchsorted(postings, positions), len(postings) - 1)
+            matched |= postings[at] == positions
+        return matched
+
+    def positions_of(self, job_ids):
+        """Catalog positions of `job_ids` (tombstones included); -1 for unknown ids."""
+        if self._position_of_code is None:
+            codes, categories = self.jobs.categorical.get('job_id', (np.zeros(0, dtype=np.int32), []))
+            present = np.flatnonzero(codes >= 0)
+            self._position_of_code = np.full(len(categories), -1, dtype=np.int64)
+            self._position_of_code[codes[present]] = present
+        codes = np.array([self.jobs.code_of('job_id', str(job_id)) for job_id in job_ids], dtype=np.int64)
+        known = (codes >= 0) & (codes < len(self._position_of_code))
+        return np.where(known, self._position_of_code[np.where(known, codes, 0)], -1)
+
+    def with_changes(self, upserts=None, deleted_ids=()):
+        """Returns (handler, changed_positions) for a new catalog version.
+
+        `upserts` is a `jobs.csv`-shaped DataFrame or a list of job dicts; a
+        job whose `job_id` already exists is replaced in place (the whole row:
+        upserts are not merged, so each must carry title, location, industry
+        and salary_range, or ValueError is raised), others are appended. `deleted_ids` become tombstones that no index returns.
+        Only the touched rows and index entries are rebuilt, and `self` is
+        left untouched so requests holding it keep a consistent view.
+        """
+        if upserts is None:
+            upserts = pd.DataFrame(columns=['job_id'])
+        elif not isinstance(upserts, pd.DataFrame):
+            upserts = pd.DataFrame(list(upserts))
+        if len(upserts) and ('job_id' not in upserts.columns or upserts['job_id'].isna().any()):
+            raise ValueError("Every upserted job needs a job_id.")
+        upserts = upserts.drop_duplicates('job_id', keep='last')
+        delta = JobStore.from_dataframe(upserts, categorical_columns=list(self.jobs.categorical) + ['job_id'])
+
+        positions = self.positions_of(upserts['job_id'])
+        is_new = positions < 0
+        positions[is_new] = len(self.jobs) + np.arange(is_new.sum())
+        deleted = self.positions_of(deleted_ids)
+        deleted = deleted[deleted >= 0]
+
+        handler = copy.copy(self)
+        handler.version = self.version + 1
+        handler.jobs = self.jobs.with_rows(positions, delta)
+        handler.live = np.zeros(len(handler.jobs), dtype=bool)
+        handler.live[:len(self.live)] = self.live
+        handler.live[positions] = True
+        handler.live[deleted] = False
+
+        changed = np.union1d(positions, deleted)
+        handler._update_indexes(self, changed)
+        return handler, changed
+
+    def _update_indexes(self, previous, changed):
+        self.location_index = self._patch_posting_lists('location', previous, changed)
+        self.industry_index = self._patch_posting_lists('industry', previous, changed)
+        self.salary_max = self.jobs.salary_max
+        self.live_positions = np.flatnonzero(self.live)
+        self._position_of_code = None
+
+    def _normalized_value(self, col, position):
+        if not self.live[position] or col not in self.jobs.categorical:
+            return None
+        codes, categories = self.jobs.categorical[col]
+        code = codes[position]
+        return categories[code].lower().strip() if code >= 0 else None
+
+    def _patch_posting_lists(self, col, previous, changed):
+        removed, added = {}, {}
+        for position in changed:
+            old = previous._normalized_value(col, position) if position < len(previous.jobs) else None
+            new = self._normalized_value(col, position)
+            if old != new:
+                if old is not None:
+                    removed.setdefault(old, []).append(position)
+                if new is not None:
+                    added.setdefault(new, []).append(position)
+
+        # A position leaves one posting list and joins another, so plain sorted deletes/inserts suffice.
+        index = getattr(previous, f'{col}_index').copy()
+        for value in set(removed) | set(added):
+            postings = index.get(value, np.zeros(0, dtype=np.int64))
+            if value in removed:
+                postings = np.delete(postings, np.searchsorted(postings, sorted(removed[value])))
+            if value in added:
+                fresh = np.array(sorted(added[value]), dtype=np.int64)
+                postings = np.insert(postings, np.searchsorted(postings, fresh), fresh)
+            index[value] = postings
+        return index
+
+    def get_store(self):
+        return self.jobs
 
     def get_jobs(self):
-        return self.jobs_df
+        jobs = self.jobs.to_dataframe()
+        return jobs if self.live.all() else jobs[self.live].reset_index(drop=True)
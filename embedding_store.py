@@ -0,0 +1,134 @@
+# file: embedding_store.py
+
+import contextlib
+import hashlib
+import os
+import threading
+import unicodedata
+import numpy as np
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FORMAT_VERSION = 1
+MAGIC = b'CREDXEMB'
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('dim', '<u4'), ('model', 'S112')])
+
+class EmbeddingStore:
+    """Append-only on-disk embedding cache keyed by (model name, text hash).
+
+    Vectors live in one flat file per model: a fixed header followed by
+    fixed-size records of a 16-byte text hash and a float32 vector. The
+    records are read through `numpy.memmap`, so every process using the
+    same file shares its pages via the OS page cache, and new texts are
+    appended under an exclusive file lock. A header that does not match
+    the current format version, model name or dimension causes the file to
+    be replaced by an empty one instead of serving stale vectors.
+    `lookup` and `add` may be called from several threads at once.
+    """
+
+    def __init__(self, cache_dir, model_name, dim):
+        self.model_name = model_name
+        self.dim = dim
+        self.record_dtype = np.dtype([('key', 'S16'), ('vector', '<f4', (dim,))])
+        slug = "".join(c if c.isalnum() or c in '-_.' else '_' for c in model_name)
+        self.path = os.path.join(cache_dir, f"{slug}.emb")
+        self._lock_path = self.path + '.lock'
+        self._rows = {}
+        self._records = None
+        self._count = 0
+        # Guards _records, _rows and _count, which _refresh replaces together.
+        self._mutex = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._open()
+
+    def _expected_header(self):
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header[0] = (MAGIC, FORMAT_VERSION, self.dim, self.model_name.encode('utf-8'))
+        return header
+
+    def _open(self):
+        with self._locked():
+            if not self._header_matches():
+                if os.path.exists(self.path):
+                    print(f"Embedding cache at {self.path} is stale or corrupt; rebuilding.")
+                # Replace rather than truncate so processes still mapping the old file are unaffected.
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(self._expected_header().tobytes())
+                os.replace(tmp_path, self.path)
+        with self._mutex:
+            self._refresh()
+
+    def _header_matches(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return f.read(HEADER_DTYPE.itemsize) == self._expected_header().tobytes()
+        except FileNotFoundError:
+            return False
+
+    def _refresh(self):
+        # Called with _mutex held.
+        size = os.path.getsize(self.path) - HEADER_DTYPE.itemsize
+        count = max(size, 0) // self.record_dtype.itemsize
+        if count == self._count:
+            return
+
+        self._records = np.memmap(self.path, dtype=self.record_dtype, mode='r', offset=HEADER_DTYPE.itemsize, shape=(count,))
+        # tobytes() keeps trailing NUL bytes that indexing an 'S16' field would strip.
+        new_keys = np.ascontiguousarray(self._records['key'][self._count:count]).tobytes()
+        for row in range(self._count, count):
+            offset = (row - self._count) * 16
+            self._rows.setdefault(new_keys[offset:offset + 16], row)
+        self._count = count
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with open(self._lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def text_key(text):
+        normalized = " ".join(unicodedata.normalize('NFC', text).split())
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+    def lookup(self, texts):
+        """Returns (vectors, missing) where rows listed in `missing` are unfilled."""
+        keys = [self.text_key(text) for text in texts]
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        found, rows, missing = [], [], []
+        with self._mutex:
+            if any(key not in self._rows for key in keys):
+                self._refresh()
+            for i, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None:
+                    missing.append(i)
+                else:
+                    found.append(i)
+                    rows.append(row)
+            if rows:
+                vectors[found] = self._records['vector'][rows]
+        return vectors, missing
+
+    def add(self, texts, vectors):
+        records = np.zeros(len(texts), dtype=self.record_dtype)
+        records['key'] = [self.text_key(text) for text in texts]
+        records['vector'] = vectors
+
+        with self._mutex:
+            with self._locked():
+                # Another process may have rebuilt the file for a different model or format.
+                if not self._header_matches():
+                    return
+                with open(self.path, 'ab') as f:
+                    f.write(records.tobytes())
+            self._refresh()
@@ -0,0 +1,79 @@
+# file: encode_batcher.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class EncodeBatcher:
+    """Coalesces encode calls from concurrent threads into batched model calls.
+
+    `encode(texts)` queues the texts and blocks on a future. A single
+    worker thread takes the first queued request, keeps collecting until
+    the batch holds `max_batch_size` texts or `max_wait_ms` has passed,
+    encodes the distinct texts in one `encode_fn` call and hands each
+    caller its own rows. A lone request therefore waits at most
+    `max_wait_ms` longer than an unbatched call.
+    """
+
+    def __init__(self, encode_fn, max_batch_size=64, max_wait_ms=3.0):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+
+    def encode(self, texts):
+        future = Future()
+        self._requests().put((list(texts), future))
+        return future.result()
+
+    def _requests(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # First use, or first use in a forked worker: the parent's thread did not survive the fork.
+                self._queue = queue.SimpleQueue()
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, args=(self._queue,), name='encode-batcher', daemon=True).start()
+            return self._queue
+
+    def _run(self, requests):
+        carried = None
+        while True:
+            batch = [carried or requests.get()]
+            carried = None
+            size = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if size + len(item[0]) > self.max_batch_size:
+                    carried = item
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch):
+        texts = list(dict.fromkeys(text for item_texts, _ in batch for text in item_texts))
+        try:
+            vectors = self.encode_fn(texts)
+            rows = {text: row for row, text in enumerate(texts)}
+            results = [vectors[[rows[text] for text in item_texts]] for item_texts, _ in batch]
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
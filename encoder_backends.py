@@ -0,0 +1,32 @@
+# file: encoder_backends.py
+
+import sys
+
+# float32: the model as published.
+# int8: every nn.Linear dynamically quantized to int8 weights, with activations
+# quantized per batch at run time. The transformer's matrix products then use
+# int8 kernels, which are several times cheaper on CPU; embeddings move by a
+# small fraction of a percent. It only helps on CPU, so the model is put there.
+BACKENDS = ('float32', 'int8')
+
+def set_torch_threads(threads):
+    """Sizes torch's intra-op thread pool for this process; no-op if `threads` is 0 or torch is not loaded."""
+    torch = sys.modules.get('torch')
+    if threads and torch is not None:
+        torch.set_num_threads(threads)
+
+def load_sentence_transformer(model_name, backend='float32', threads=0):
+    """Loads `model_name` with the given backend (see BACKENDS)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}; expected one of: {', '.join(BACKENDS)}.")
+    # Imported here rather than at module level: sentence-transformers pulls in
+    # torch, which takes seconds, and only the process that loads the model needs it.
+    import torch
+    from sentence_transformers import SentenceTransformer
+    set_torch_threads(threads)
+    if backend == 'float32':
+        return SentenceTransformer(model_name)
+    model = SentenceTransformer(model_name, device='cpu')
+    model.eval()
+    torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
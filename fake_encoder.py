@@ -0,0 +1,58 @@
+# file: fake_encoder.py
+
+import hashlib
+import threading
+import time
+import numpy as np
+
+class FakeSentenceEncoder:
+    """Offline, deterministic stand-in for `SentenceTransformer`.
+
+    Each text becomes a signed sum of hashed character trigrams, so texts
+    that share spelling ("Python", "python 3") score as similar and every
+    run produces the same vectors. Use it via
+    `SemanticMatcher.model_factory = FakeSentenceEncoder`; `calls` and
+    `texts_encoded` count what was asked of the model. `call_delay` sleeps
+    that many seconds per `encode` call, standing in for the fixed cost of
+    a forward pass; calls sleep one at a time, as forward passes that each
+    use every core would.
+    """
+
+    def __init__(self, model_name='fake-encoder', dim=384, call_delay=0.0):
+        self.model_name = model_name
+        self.dim = dim
+        self.call_delay = call_delay
+        self.calls = 0
+        self.texts_encoded = 0
+        self._lock = threading.Lock()
+        self._forward_lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        # Lets an instance double as a model factory that always returns itself.
+        return self
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        padded = f"  {text.lower()}  "
+        for i in range(len(padded) - 2):
+            digest = int.from_bytes(hashlib.blake2b(padded[i:i + 3].encode('utf-8'), digest_size=8).digest(), 'little')
+            vector[digest % self.dim] += 1.0 if (digest >> 32) & 1 else -1.0
+        return vector
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        with self._lock:
+            self.calls += 1
+            self.texts_encoded += len(texts)
+        if self.call_delay:
+            with self._forward_lock:
+                time.sleep(self.call_delay)
+
+        vectors = np.stack([self._embed(text) for text in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+        if normalize_embeddings:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors[0] if single else vectors
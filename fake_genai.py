@@ -0,0 +1,46 @@
+# file: fake_genai.py
+
+import json
+import threading
+import time
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeGenerativeModel:
+    """Offline stand-in for `genai.GenerativeModel` with a configurable delay.
+
+    Pass it (or a factory returning it) wherever a `model_factory` is
+    accepted to test or benchmark LLM-backed code without network access.
+    `response` may be a string or a callable taking the prompt.
+    """
+
+    def __init__(self, model_name='gemini-1.5-flash', delay=0.0, response=None, fail=False):
+        self.model_name = model_name
+        self.delay = delay
+        self.response = response
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        # Lets an instance double as a model factory that always returns itself.
+        return self
+
+    def generate_content(self, contents, generation_config=None):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("FakeGenerativeModel configured to fail.")
+
+        prompt = contents if isinstance(contents, str) else "\n".join(str(part) for part in contents)
+        if callable(self.response):
+            return FakeResponse(self.response(prompt))
+        if self.response is not None:
+            return FakeResponse(self.response)
+        if generation_config is not None:
+            return FakeResponse(json.dumps({"skills": [], "titles": [], "locations": [], "industries": []}))
+        return FakeResponse("This role is a strong match for your skills.")
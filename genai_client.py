@@ -0,0 +1,31 @@
+# file: genai_client.py
+
+from lazy_imports import is_installed, optional_import
+
+# google.generativeai takes seconds to import, so GenAIClient.new_model imports it on first use.
+GENAI_INSTALLED = is_installed('google.generativeai')
+MODEL_NAME = 'gemini-1.5-flash'
+
+class GenAIClient:
+    """Makes Gemini models for the LLM features, or uses `model_factory` instead.
+
+    `model_factory` is called with no arguments for each new model; with it
+    set, the SDK and API key are not needed (see fake_genai.py).
+    """
+
+    def __init__(self, api_key, model_factory=None):
+        self.api_key = api_key
+        self.model_factory = model_factory
+
+    def sdk_missing(self):
+        return not GENAI_INSTALLED and self.model_factory is None
+
+    def available(self):
+        if self.model_factory is not None:
+            return True
+        return bool(self.api_key) and self.api_key != "YOUR_API_KEY_HERE" and GENAI_INSTALLED
+
+    def new_model(self):
+        if self.model_factory is not None:
+            return self.model_factory()
+        return optional_import('google.generativeai').GenerativeModel(MODEL_NAME)
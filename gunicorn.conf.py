@@ -0,0 +1,31 @@
+# file: gunicorn.conf.py
+
+import gc
+import os
+
+# Load the model, job catalog and embedding index once in the master (see
+# app.warm_up); forked workers share those pages copy-on-write, so a worker
+# starts in milliseconds and adding workers does not add a copy of the model.
+os.environ['PRELOAD_APP'] = '1'
+preload_app = True
+
+# Threaded workers: merge concurrent requests' small encode calls into one model call.
+os.environ.setdefault('ENCODE_BATCH_WINDOW_MS', '2')
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# Split the cores between workers instead of letting each worker's torch use all of them.
+os.environ.setdefault('ENCODER_THREADS', str(max(1, (os.cpu_count() or 1) // workers)))
+timeout = 120
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker forks.
+    # Freezing moves every object loaded so far out of the collector's reach;
+    # otherwise a GC pass in a worker writes to their headers and un-shares the pages.
+    gc.freeze()
+
+def post_fork(server, worker):
+    import app
+    app.start_background_tasks()
@@ -0,0 +1,243 @@
+# file: job_index.py
+
+import copy
+import numpy as np
+
+def skill_set_segments(offsets, sizes, members, set_ids):
+    """Member skill ids and reduceat start offsets for the non-empty sets in `set_ids`."""
+    present = sizes[set_ids] > 0
+    set_sizes = sizes[set_ids][present]
+    source_starts = offsets[set_ids][present]
+    starts = np.zeros(len(set_sizes), dtype=np.int64)
+    np.cumsum(set_sizes[:-1], out=starts[1:])
+    member_positions = np.repeat(source_starts - starts, set_sizes) + np.arange(set_sizes.sum())
+    return members[member_positions], starts
+
+class JobEmbeddingIndex:
+    """Job-side embeddings built once per catalog, aligned with `JobStore` rows.
+
+    Titles and skills come interned from the store's vocabularies, so each
+    distinct text is encoded exactly once. Jobs that require the same set of skills
+    share a "skill set", stored CSR-style (`skill_set_offsets` +
+    `skill_set_members`); `skill_set_ids` maps every job to its set. Skill
+    scores are computed once per distinct set and gathered back per job.
+    """
+
+    def __init__(self, jobs, semantic_matcher):
+        self.semantic_matcher = semantic_matcher
+        self.size = len(jobs)
+
+        self.title_vocab, self.title_ids = self._title_codes(jobs)
+        self.skill_vocab, self.skill_set_ids, self.skill_set_offsets, self.skill_set_members = self._intern_skill_sets(jobs)
+        self.skill_set_sizes = np.diff(self.skill_set_offsets)
+        self._skill_lookup = {skill: skill_id for skill_id, skill in enumerate(self.skill_vocab)}
+        self._title_lookup = {title: title_id for title_id, title in enumerate(self.title_vocab)}
+
+        self.title_vectors = self.semantic_matcher.encode(self.title_vocab)
+        self.skill_vectors = self.semantic_matcher.encode(self.skill_vocab)
+
+        # get_similarity() scores an empty title or skill list as 0.
+        self._title_present = np.array([bool(t) for t in self.title_vocab], dtype=bool)
+        self._skill_set_present = self.skill_set_sizes > 0
+
+    def _title_codes(self, jobs):
+        if 'title' not in jobs.categorical:
+            return [''], np.zeros(self.size, dtype=np.int32)
+        codes, categories = jobs.categorical['title']
+        # Missing titles point at a leading empty title, which scores 0.
+        return [''] + list(categories), (codes + 1).astype(np.int32)
+
+    def _intern_skill_sets(self, jobs):
+        if 'required_skills' not in jobs.lists:
+            return [], np.zeros(self.size, dtype=np.int32), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32)
+        offsets, ids, vocab = jobs.lists['required_skills']
+
+        # Sort each job's skill ids and drop duplicates: neither order nor
+        # duplicates can change overlap or max-over-job-skills scores.
+        job_of_entry = np.repeat(np.arange(self.size), np.diff(offsets))
+        order = np.argsort(job_of_entry * max(len(vocab), 1) + ids, kind='stable')
+        sorted_ids, sorted_jobs = ids[order], job_of_entry[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = (sorted_ids[1:] != sorted_ids[:-1]) | (sorted_jobs[1:] != sorted_jobs[:-1])
+        unique_ids, unique_jobs = sorted_ids[keep], sorted_jobs[keep]
+
+        # One padded row per job, then intern identical rows as one skill set.
+        sizes = np.bincount(unique_jobs, minlength=self.size)
+        starts = np.zeros(self.size, dtype=np.int64)
+        np.cumsum(sizes[:-1], out=starts[1:])
+        padded = np.full((self.size, int(sizes.max(initial=0))), -1, dtype=np.int32)
+        padded[unique_jobs, np.arange(len(unique_ids)) - starts[unique_jobs]] = unique_ids
+        # Sorting rows with one lexsort pass per column is far cheaper than np.unique(axis=0).
+        row_order = np.lexsort(padded.T[::-1]) if padded.shape[1] else np.arange(self.size)
+        sorted_rows = padded[row_order]
+        new_set = np.ones(self.size, dtype=bool)
+        new_set[1:] = (sorted_rows[1:] != sorted_rows[:-1]).any(axis=1)
+        set_ids = np.empty(self.size, dtype=np.int64)
+        set_ids[row_order] = np.cumsum(new_set) - 1
+        set_rows = sorted_rows[new_set]
+
+        present = set_rows >= 0
+        set_offsets = np.zeros(len(set_rows) + 1, dtype=np.int64)
+        np.cumsum(present.sum(axis=1), out=set_offsets[1:])
+        return list(vocab), set_ids.astype(np.int32), set_offsets, set_rows[present].astype(np.int32)
+
+    def with_changes(self, jobs, changed):
+        """Returns an index for `jobs`, a later version of this index's store.
+
+        Only the rows at `changed` are re-read. Titles and skills that are new
+        to the vocabularies are encoded and appended; the changed jobs get
+        freshly appended skill sets (duplicates of existing sets are harmless
+        and disappear on the next full build). `self` is left untouched.
+        """
+        index = copy.copy(self)
+        index.size = len(jobs)
+        rows = changed[changed < index.size]
+
+        if 'title' in jobs.categorical:
+            codes, categories = jobs.categorical['title']
+            new_titles = list(categories[len(self.title_vocab) - 1:])
+            index.title_vocab = self.title_vocab + new_titles
+            index.title_ids = self._grow(self.title_ids, index.size)
+            index.title_ids[rows] = codes[rows] + 1
+            if new_titles:
+                index._title_lookup = dict(self._title_lookup)
+                index._title_lookup.update((title, len(self.title_vocab) + i) for i, title in enumerate(new_titles))
+                index.title_vectors = self._append_vectors(self.title_vectors, len(self.title_vocab), new_titles)
+                index._title_present = np.append(self._title_present, [bool(t) for t in new_titles])
+
+        if 'required_skills' in jobs.lists:
+            offsets, ids, vocab = jobs.lists['required_skills']
+            new_skills = list(vocab[len(self.skill_vocab):])
+            if new_skills:
+                index.skill_vocab = self.skill_vocab + new_skills
+                index._skill_lookup = dict(self._skill_lookup)
+                index._skill_lookup.update((skill, len(self.skill_vocab) + i) for i, skill in enumerate(new_skills))
+                index.skill_vectors = self._append_vectors(self.skill_vectors, len(self.skill_vocab), new_skills)
+
+            job_sets = [np.unique(ids[offsets[position]:offsets[position + 1]]) for position in rows]
+            index.skill_set_ids = self._grow(self.skill_set_ids, index.size)
+            index.skill_set_ids[rows] = len(self.skill_set_sizes) + np.arange(len(rows))
+            sizes = np.array([len(members) for members in job_sets], dtype=np.int64)
+            index.skill_set_sizes = np.concatenate((self.skill_set_sizes, sizes))
+            index.skill_set_offsets = np.concatenate((self.skill_set_offsets, self.skill_set_offsets[-1] + np.cumsum(sizes)))
+            index.skill_set_members = np.concatenate([self.skill_set_members] + job_sets).astype(np.int32)
+            index._skill_set_present = index.skill_set_sizes > 0
+        return index
+
+    @staticmethod
+    def _grow(values, size):
+        grown = np.zeros(size, dtype=values.dtype)
+        grown[:len(values)] = values
+        return grown
+
+    def _append_vectors(self, vectors, known, texts):
+        # No vectors for a non-empty vocabulary means the model is unavailable.
+        if vectors is None and known:
+            return None
+        new_vectors = self.semantic_matcher.encode(texts)
+        if new_vectors is None or vectors is None:
+            return new_vectors
+        return np.concatenate((vectors, new_vectors))
+
+    def _skill_set_segments(self, set_ids):
+        return skill_set_segments(self.skill_set_offsets, self.skill_set_sizes, self.skill_set_members, set_ids)
+
+    def skill_set_overlaps(self, candidate_skills, set_ids):
+        """Number of distinct candidate skills that appear verbatim in each of `set_ids`."""
+        counts = np.zeros(len(set_ids), dtype=np.int64)
+        candidate_ids = [self._skill_lookup[s] for s in set(candidate_skills) if s in self._skill_lookup]
+        present = self._skill_set_present[set_ids]
+        if not candidate_ids or not present.any():
+            return counts
+
+        is_candidate_skill = np.zeros(len(self.skill_vocab), dtype=np.int64)
+        is_candidate_skill[candidate_ids] = 1
+        members, starts = self._skill_set_segments(set_ids)
+        counts[present] = np.add.reduceat(is_candidate_skill[members], starts)
+        return counts
+
+    def skill_vocab_scores(self, candidate_vectors):
+        """Similarity of every vocabulary skill to each candidate vector (vocab x candidates)."""
+        if self.skill_vectors is None or candidate_vectors is None:
+            return None
+        return self.skill_vectors @ candidate_vectors.T
+
+    def title_vocab_scores(self, candidate_vectors):
+        """Similarity of every vocabulary title to each candidate vector (vocab x candidates)."""
+        if self.title_vectors is None or candidate_vectors is None:
+            return None
+        return np.where(self._title_present[:, None], self.title_vectors @ candidate_vectors.T, np.float32(0))
+
+    def skill_set_scores(self, candidate_skills, set_ids, vocab_scores=None):
+        """Semantic skill competency of the candidate against each of `set_ids`.
+
+        Mirrors `get_similarity(candidate_skills, job_skills)`: for each
+        candidate skill take the best-matching job skill, then average.
+        `vocab_scores` (vocab x candidate skills) is computed from
+        `candidate_skills` when not supplied.
+        """
+        scores = np.zeros(len(set_ids), dtype=np.float32)
+        present = self._skill_set_present[set_ids]
+        if not candidate_skills or self.skill_vectors is None or not present.any():
+            return scores
+
+        if vocab_scores is None:
+            vocab_scores = self.skill_vocab_scores(self.semantic_matcher.encode(candidate_skills))
+            if vocab_scores is None:
+                return scores
+
+        members, starts = self._skill_set_segments(set_ids)
+        best_per_candidate_skill = np.maximum.reduceat(vocab_scores[members], starts, axis=0)
+        scores[present] = best_per_candidate_skill.mean(axis=1)
+        return scores
+
+    def title_scores(self, candidate_titles, positions, vocab_scores=None):
+        """Cosine similarity of the job titles at `positions` to the candidate's titles.
+
+        Mirrors `get_similarity(job_title, candidate_titles)`, which compares
+        the job title against the first candidate title. `vocab_scores`
+        (one score per vocabulary title) is computed when not supplied.
+        """
+        if not candidate_titles or self.title_vectors is None:
+            return np.zeros(len(positions), dtype=np.float32)
+
+        if vocab_scores is None:
+            vocab_scores = self.title_vocab_scores(self.semantic_matcher.encode(candidate_titles[:1]))
+            if vocab_scores is None:
+                return np.zeros(len(positions), dtype=np.float32)
+            vocab_scores = vocab_scores[:, 0]
+
+        return vocab_scores[self.title_ids[positions]]
+
+    def skill_similarity_lookup(self, user_skill, similarities=None):
+        """Returns a function giving the cosine similarity of a job skill to `user_skill`.
+
+        `similarities` are `user_skill`'s scores against the skill vocabulary;
+        without them, `user_skill` is encoded once and scored here.
+        """
+        if similarities is None:
+            similarities = self._vocab_similarities(self.skill_vectors, user_skill)
+        return self._similarity_lookup(similarities, self._skill_lookup, user_skill)
+
+    def title_similarity_lookup(self, user_title, similarities=None):
+        """Returns a function giving the cosine similarity of a job title to `user_title`."""
+        if similarities is None:
+            similarities = self._vocab_similarities(self.title_vectors, user_title)
+        return self._similarity_lookup(similarities, self._title_lookup, user_title)
+
+    def _vocab_similarities(self, vocab_vectors, text):
+        if vocab_vectors is None:
+            return None
+        vectors = self.semantic_matcher.encode([text])
+        return None if vectors is None else vocab_vectors @ vectors[0]
+
+    def _similarity_lookup(self, similarities, vocab_lookup, user_value):
+        def lookup(job_value):
+            # get_similarity() scores an empty text as 0.
+            if not job_value or similarities is None:
+                return 0.0
+            vocab_id = vocab_lookup.get(job_value)
+            if vocab_id is None:
+                return self.semantic_matcher.get_similarity(job_value, [user_value])
+            return float(similarities[vocab_id])
+        return lookup
@@ -0,0 +1,401 @@
+# file: job_store.py
+
+import json
+import time
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+LIST_COLUMNS = ('required_skills', 'values_promoted')
+SALARY_COLUMN = 'salary_range'
+# Rows without these are rejected: matching and the result details read them for every job.
+REQUIRED_COLUMNS = ('title', 'location', 'industry', SALARY_COLUMN)
+DEFAULT_CHUNK_ROWS = 100000
+SALARY_PATTERN = r'^\s*\[\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*\]\s*$'
+MAX_REPORTED_BAD_ROWS = 20
+
+class JobStore:
+    """Compact columnar job catalog.
+
+    - string columns (location, industry, company, role_level, ...) are
+      categorical: `categorical[col] = (codes, categories)`, code -1 = missing
+    - `;`-separated list columns are interned into a vocabulary and stored
+      CSR-style: `lists[col] = (offsets, ids, vocab)`
+    - `salary_range` is split into int64 `salary_min` / `salary_max` arrays
+    - anything else (numeric columns) is kept as a plain array
+
+    `save`/`load` use an uncompressed `.npz` without pickles, so loading is
+    mostly a matter of reading the arrays back.
+
+    Stores are never modified in place: `with_rows` returns a new store.
+    Category and list vocabularies only ever grow, so a derived store
+    appends to (and shares) its parent's vocabulary lists; codes held by
+    the parent stay valid.
+    """
+
+    def __init__(self, size, columns, categorical, lists, salary_min, salary_max, numeric, lookups=None):
+        self.size = size
+        self.columns = columns
+        self.categorical = categorical
+        self.lists = lists
+        self.salary_min = salary_min
+        self.salary_max = salary_max
+        self.numeric = numeric
+        # value -> code dicts for the vocabularies, built on first use.
+        self._lookups = {} if lookups is None else lookups
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def empty(self):
+        return self.size == 0
+
+    @classmethod
+    def empty_store(cls):
+        return cls(0, [], {}, {}, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), {})
+
+    @classmethod
+    def from_dataframe(cls, df, categorical_columns=()):
+        """Builds a store from a `jobs.csv`-shaped frame.
+
+        List and salary columns may hold the raw CSV strings or already-parsed
+        lists. Columns named in `categorical_columns` are kept categorical even
+        if every value looks numeric. Raises ValueError listing any invalid rows.
+        """
+        builder = _StoreBuilder(categorical_columns)
+        builder.add(df)
+        if builder.bad_rows:
+            problems = "; ".join(f"row {row}: {reason}" for row, reason in builder.errors)
+            raise ValueError(f"{builder.bad_rows} invalid job row(s): {problems}")
+        return builder.build()
+
+    @classmethod
+    def from_csv(cls, path, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Streams a `jobs.csv` file into a store, `chunk_rows` rows at a time.
+
+        Every chunk is parsed with vectorized string operations and reduced
+        to codes before the next one is read, so peak memory stays close to
+        the final store size. Rows without a job_id or with a malformed
+        `salary_range` are skipped. Returns (store, report) where `report`
+        has the row counts, the first few bad rows as (line, reason) pairs
+        and the elapsed seconds.
+        """
+        start = time.perf_counter()
+        # CSV line numbers: the header is line 1.
+        builder = _StoreBuilder(first_row=2)
+        for chunk in pd.read_csv(path, dtype=str, chunksize=chunk_rows):
+            builder.add(chunk)
+        store = builder.build()
+        report = {
+            'rows': builder.rows_read,
+            'jobs': len(store),
+            'bad_rows': builder.bad_rows,
+            'errors': sorted(builder.errors),
+            'seconds': time.perf_counter() - start,
+        }
+        return store, report
+
+    @classmethod
+    def load(cls, path, expected_signature=None):
+        """Loads a store saved by `save`; returns None if it is missing, stale or from another format."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data['format_version']) != FORMAT_VERSION:
+                    return None
+                if expected_signature is not None and data['source_signature'].tolist() != list(expected_signature):
+                    return None
+                columns = data['columns'].tolist()
+                categorical, lists, numeric = {}, {}, {}
+                for col in columns:
+                    if col in LIST_COLUMNS:
+                        lists[col] = (data[f'{col}.offsets'], data[f'{col}.ids'], data[f'{col}.vocab'].tolist())
+                    elif f'{col}.codes' in data:
+                        categorical[col] = (data[f'{col}.codes'], data[f'{col}.categories'].tolist())
+                    elif f'{col}.values' in data:
+                        numeric[col] = data[f'{col}.values']
+                return cls(int(data['size']), columns, categorical, lists, data['salary_min'], data['salary_max'], numeric)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, path, source_signature=()):
+        arrays = {
+            'format_version': np.array(FORMAT_VERSION),
+            'source_signature': np.array(source_signature, dtype=np.int64),
+            'size': np.array(self.size),
+            'columns': np.array(self.columns, dtype=str),
+            'salary_min': self.salary_min,
+            'salary_max': self.salary_max,
+        }
+        for col, (codes, categories) in self.categorical.items():
+            arrays[f'{col}.codes'] = codes
+            arrays[f'{col}.categories'] = np.array(categories, dtype=str)
+        for col, (offsets, ids, vocab) in self.lists.items():
+            arrays[f'{col}.offsets'] = offsets
+            arrays[f'{col}.ids'] = ids
+            arrays[f'{col}.vocab'] = np.array(vocab, dtype=str)
+        for col, values in self.numeric.items():
+            arrays[f'{col}.values'] = values
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    def row(self, position):
+        """The job at `position` as a dict, in the shape the rest of the app expects."""
+        job = {}
+        for col in self.columns:
+            if col in self.categorical:
+                codes, categories = self.categorical[col]
+                code = codes[position]
+                job[col] = categories[code] if code >= 0 else None
+            elif col in self.lists:
+                offsets, ids, vocab = self.lists[col]
+                job[col] = [vocab[i] for i in ids[offsets[position]:offsets[position + 1]]]
+            elif col == SALARY_COLUMN:
+                job[col] = [int(self.salary_min[position]), int(self.salary_max[position])]
+            else:
+                job[col] = self.numeric[col][position].item()
+        return job
+
+    def with_rows(self, positions, delta):
+        """Returns a new store with the rows of store `delta` written at `positions`.
+
+        Positions below `len(self)` replace existing rows; the others must
+        continue the sequence `len(self)`, `len(self) + 1`, ... and are
+        appended. Only the touched rows are re-encoded; everything else is
+        copied array-wise.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        size = max(self.size, int(positions.max(initial=-1)) + 1)
+        columns = self.columns + [col for col in delta.columns if col not in self.columns]
+        categorical, lists, numeric = {}, {}, {}
+        for col in columns:
+            if col in LIST_COLUMNS:
+                offsets, ids, vocab = self.lists.get(col) or (np.zeros(self.size + 1, dtype=np.int64), np.zeros(0, dtype=np.int32), [])
+                delta_offsets, delta_ids, delta_vocab = delta.lists.get(col) or (np.zeros(delta.size + 1, dtype=np.int64), np.zeros(0, dtype=np.int32), [])
+                mapping = self._extend_vocab(col, vocab, delta_vocab)
+                offsets, ids = _splice_lists(offsets, ids, size, positions, delta_offsets, mapping[delta_ids])
+                lists[col] = (offsets, ids, vocab)
+            elif col == SALARY_COLUMN:
+                continue
+            elif col in self.numeric or col in delta.numeric:
+                values = self.numeric.get(col, np.zeros(self.size, dtype=delta.numeric.get(col, np.zeros(0)).dtype))
+                delta_values = delta.numeric.get(col, np.zeros(delta.size, dtype=values.dtype))
+                numeric[col] = _scatter(values, size, positions, delta_values, fill=0)
+            else:
+                codes, categories = self.categorical.get(col) or (np.full(self.size, -1, dtype=np.int32), [])
+                delta_codes, delta_categories = delta.categorical.get(col) or (np.full(delta.size, -1, dtype=np.int32), [])
+                mapping = np.append(self._extend_vocab(col, categories, delta_categories), -1)
+                categorical[col] = (_scatter(codes, size, positions, mapping[delta_codes], fill=-1), categories)
+
+        salary_min = _scatter(self.salary_min, size, positions, delta.salary_min, fill=0)
+        salary_max = _scatter(self.salary_max, size, positions, delta.salary_max, fill=0)
+        return JobStore(size, columns, categorical, lists, salary_min, salary_max, numeric, lookups=self._lookups)
+
+    def _extend_vocab(self, col, vocab, items):
+        """Appends unseen `items` to `vocab` in place; returns their codes as an array."""
+        lookup = self._lookups.get(col)
+        if lookup is None or len(lookup) != len(vocab):
+            lookup = self._lookups[col] = {item: code for code, item in enumerate(vocab)}
+        codes = np.empty(len(items), dtype=np.int32)
+        for i, item in enumerate(items):
+            code = lookup.get(item)
+            if code is None:
+                code = lookup[item] = len(vocab)
+                vocab.append(item)
+            codes[i] = code
+        return codes
+
+    def code_of(self, col, value):
+        """Category code of `value` in categorical column `col`, or -1."""
+        if col not in self.categorical:
+            return -1
+        categories = self.categorical[col][1]
+        lookup = self._lookups.get(col)
+        if lookup is None or len(lookup) != len(categories):
+            lookup = self._lookups[col] = {item: code for code, item in enumerate(categories)}
+        return lookup.get(value, -1)
+
+    def to_dataframe(self):
+        return pd.DataFrame([self.row(position) for position in range(self.size)], columns=self.columns)
+
+class _StoreBuilder:
+    """Accumulates `jobs.csv`-shaped chunks into the arrays of one JobStore.
+
+    Categories and list vocabularies are interned across chunks in
+    first-seen order, so building from one frame or from many chunks of it
+    gives the same store.
+    """
+
+    def __init__(self, categorical_columns=(), first_row=0):
+        self.categorical_columns = set(categorical_columns)
+        self.columns = None
+        self.rows_read = 0
+        self.bad_rows = 0
+        self.errors = []
+        self._first_row = first_row
+        self._numeric_columns = set()
+        self._vocabs = {}
+        self._codes = {}
+        self._list_lengths = {}
+        self._list_ids = {}
+        self._salary = []
+        self._numeric = {}
+
+    def add(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self._numeric_columns = {
+                col for col in self.columns
+                if col not in LIST_COLUMNS and col != SALARY_COLUMN and col not in self.categorical_columns
+                and pd.api.types.is_numeric_dtype(chunk[col])
+            }
+
+        valid = np.ones(len(chunk), dtype=bool)
+        if 'job_id' in chunk.columns:
+            self._reject(valid, chunk['job_id'].isna().to_numpy(), "missing job_id")
+        for col in REQUIRED_COLUMNS:
+            if col not in chunk.columns:
+                self._reject(valid, np.ones(len(chunk), dtype=bool), f"missing {col}")
+            elif col != SALARY_COLUMN:
+                blank = chunk[col].astype('string').str.strip().eq('').fillna(True).to_numpy(dtype=bool)
+                self._reject(valid, blank, f"missing {col}")
+        if SALARY_COLUMN in chunk.columns:
+            salary = self._parse_salary(chunk[SALARY_COLUMN])
+            malformed = np.isnan(salary).any(axis=1)
+            self._reject(valid, chunk[SALARY_COLUMN].isna().to_numpy(), "missing salary_range")
+            self._reject(valid, malformed, "malformed salary_range", chunk[SALARY_COLUMN])
+            self._reject(valid, ~malformed & (salary[:, 0] > salary[:, 1]), "salary_range minimum above maximum", chunk[SALARY_COLUMN])
+            self._salary.append(salary[valid].astype(np.int64))
+        self.rows_read += len(chunk)
+        if not valid.all():
+            chunk = chunk[valid]
+
+        for col in self.columns:
+            if col in LIST_COLUMNS:
+                self._add_lists(col, chunk[col])
+            elif col == SALARY_COLUMN:
+                continue
+            elif col in self._numeric_columns:
+                values = chunk[col] if pd.api.types.is_numeric_dtype(chunk[col]) else pd.to_numeric(chunk[col], errors='coerce')
+                self._numeric.setdefault(col, []).append(values.to_numpy())
+            else:
+                values = chunk[col].astype('string') if col in self.categorical_columns else chunk[col]
+                codes, uniques = pd.factorize(values)
+                self._codes.setdefault(col, []).append(self._intern(col, codes, uniques))
+
+    def _reject(self, valid, bad, reason, values=None):
+        bad = bad & valid
+        if not bad.any():
+            return
+        valid &= ~bad
+        self.bad_rows += int(bad.sum())
+        for row in np.flatnonzero(bad)[:MAX_REPORTED_BAD_ROWS - len(self.errors)]:
+            detail = f" {values.iloc[row]!r}" if values is not None else ""
+            self.errors.append((self._first_row + self.rows_read + int(row), reason + detail))
+
+    def _intern(self, col, codes, uniques):
+        """Maps chunk-local factorize codes to codes in the column's running vocabulary."""
+        vocab = self._vocabs.setdefault(col, {})
+        mapping = np.array([vocab.setdefault(value, len(vocab)) for value in uniques.tolist()] + [-1], dtype=np.int32)
+        return mapping[codes]
+
+    @staticmethod
+    def _as_text(values, to_text):
+        # Parsed values (lists from JSON upserts) are turned back into their CSV text form.
+        if pd.api.types.is_object_dtype(values):
+            values = values.map(lambda x: to_text(x) if isinstance(x, (list, tuple)) else x)
+        return values.astype('string')
+
+    def _parse_salary(self, values):
+        """(n x 2) float array of salary bounds; NaN rows are malformed."""
+        values = self._as_text(values, lambda x: json.dumps(list(x)))
+        bounds = self._parse_well_formed_salaries(values)
+        if bounds is None:
+            # Some row is off; the exact per-row pattern finds out which.
+            bounds = values.str.extract(SALARY_PATTERN).apply(pd.to_numeric)
+            bounds = bounds.to_numpy(dtype=np.float64, na_value=np.nan)
+        return bounds.reshape(len(values), 2)
+
+    @staticmethod
+    def _parse_well_formed_salaries(values):
+        # Fast path: when every row looks like "[min, max]", parse them all with one C call.
+        if values.isna().any():
+            return None
+        text = np.char.strip(values.to_numpy(dtype=str))
+        if not ((np.char.count(text, ',') == 1) & np.char.startswith(text, '[') & np.char.endswith(text, ']')).all():
+            return None
+        try:
+            bounds = np.fromstring(','.join(np.char.strip(text, '[] ').tolist()), sep=',')
+        except ValueError:
+            return None
+        if len(bounds) != 2 * len(values) or not np.isfinite(bounds).all():
+            return None
+        return bounds
+
+    def _add_lists(self, col, values):
+        # Many jobs share the same list text, so each distinct text is split once.
+        values = self._as_text(values, lambda x: ';'.join(str(item) for item in x) if x else None)
+        codes, texts = pd.factorize(values)
+        vocab = self._vocabs.setdefault(col, {})
+        text_items = [[vocab.setdefault(item.strip(), len(vocab)) for item in text.split(';')] for text in texts.tolist()]
+        text_lengths = np.array([len(items) for items in text_items] + [0], dtype=np.int64)
+        text_offsets = np.zeros(len(text_lengths) + 1, dtype=np.int64)
+        np.cumsum(text_lengths, out=text_offsets[1:])
+        text_ids = np.fromiter((item for items in text_items for item in items), dtype=np.int32, count=text_offsets[-2])
+
+        # Gather each row's ids from its text's segment; code -1 (missing) has length 0.
+        lengths = text_lengths[codes]
+        row_starts = np.zeros(len(lengths), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=row_starts[1:])
+        gather = np.repeat(text_offsets[codes] - row_starts, lengths) + np.arange(lengths.sum())
+        self._list_lengths.setdefault(col, []).append(lengths)
+        self._list_ids.setdefault(col, []).append(text_ids[gather])
+
+    def build(self):
+        columns = self.columns or []
+        size = self.rows_read - self.bad_rows
+        categorical, lists, numeric = {}, {}, {}
+        for col in columns:
+            if col in LIST_COLUMNS:
+                offsets = np.zeros(size + 1, dtype=np.int64)
+                np.cumsum(_concat(self._list_lengths.get(col), np.int64), out=offsets[1:])
+                lists[col] = (offsets, _concat(self._list_ids.get(col), np.int32), list(self._vocabs.get(col, {})))
+            elif col == SALARY_COLUMN:
+                continue
+            elif col in self._numeric_columns:
+                numeric[col] = _concat(self._numeric.get(col), np.float64)
+            else:
+                categorical[col] = (_concat(self._codes.get(col), np.int32), list(self._vocabs.get(col, {})))
+
+        salary = np.concatenate(self._salary) if self._salary else np.zeros((size, 2), dtype=np.int64)
+        return JobStore(size, columns, categorical, lists, salary[:, 0].copy(), salary[:, 1].copy(), numeric)
+
+def _concat(chunks, dtype):
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtype)
+
+def _scatter(values, size, positions, new_values, fill):
+    out = np.full(size, fill, dtype=values.dtype)
+    out[:len(values)] = values
+    out[positions] = new_values
+    return out
+
+def _splice_lists(offsets, ids, size, positions, delta_offsets, delta_ids):
+    """CSR lists with the rows at `positions` replaced by the `delta` rows, in order."""
+    lengths = np.zeros(size, dtype=np.int64)
+    lengths[:len(offsets) - 1] = np.diff(offsets)
+    lengths[positions] = np.diff(delta_offsets)
+    new_offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    new_ids = np.empty(new_offsets[-1], dtype=np.int32)
+
+    # Copy each run of untouched old rows in one slice, then write the delta rows.
+    old_size = len(offsets) - 1
+    touched = np.unique(positions[positions < old_size])
+    run_starts = np.concatenate(([0], touched + 1))
+    run_ends = np.concatenate((touched, [old_size]))
+    for start, end in zip(run_starts, run_ends):
+        if start < end:
+            new_ids[new_offsets[start]:new_offsets[end]] = ids[offsets[start]:offsets[end]]
+    for row, position in enumerate(positions):
+        new_ids[new_offsets[position]:new_offsets[position + 1]] = delta_ids[delta_offsets[row]:delta_offsets[row + 1]]
+    return new_offsets, new_ids
@@ -0,0 +1,18 @@
+# file: lazy_imports.py
+
+import importlib
+import importlib.util
+
+def is_installed(name):
+    """True if module `name` can be imported, checked without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+def optional_import(name):
+    """Imports module `name` on first use; returns None when it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
@@ -1,8 +1,21 @@
 # file: matching_engine.py
 
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
 import pandas as pd
+from caching import LRUCache
+from candidate_retrieval import CandidateRetriever
 from data_handler import DataHandler
+from job_index import JobEmbeddingIndex
+from metrics import metrics
+from ranking import SCORE_COMPONENTS, can_pass_threshold, combine_scores, select_top
 from semantic_matcher import SemanticMatcher
+from sharded_scorer import ShardedScorer
 from skills_scorer import SkillsScorer
 from story_generator import StoryGenerator
 import locale
@@ -12,15 +25,225 @@ try:
 except locale.Error:
     locale.setlocale(locale.LC_ALL, '')
 
+# Largest page `get_recommendation_page` serves, and how many of a query's best
+# jobs its ranked snapshot keeps for later pages.
+MAX_PAGE_SIZE = 50
+RANKED_SNAPSHOT_SIZE = 500
+SCORE_DISPLAY_NAMES = {'skills': 'Skills', 'title': 'Title', 'location': 'Location', 'industry': 'Industry', 'salary': 'Salary'}
+
+def _change_records(upserts):
+    # Upserts as a list of plain job dicts (or None), the form CatalogChangeLog stores.
+    if upserts is None:
+        return None
+    if not isinstance(upserts, pd.DataFrame):
+        upserts = pd.DataFrame(list(upserts))
+    return json.loads(upserts.to_json(orient='records', double_precision=15)) or None
+
+class CatalogSnapshot:
+    """One immutable catalog version: the jobs, their filter indexes and embeddings.
+
+    Requests read `Recommender.catalog` once and use that snapshot
+    throughout, so a concurrent update never mixes two versions.
+    """
+
+    def __init__(self, data_handler, job_index):
+        self.data_handler = data_handler
+        self.jobs = data_handler.get_store()
+        self.job_index = job_index
+        self.version = data_handler.version
+
 class Recommender:
-    def __init__(self, jobs_file_path, api_key):
-        self.data_handler = DataHandler(jobs_file_path)
-        self.jobs_df = self.data_handler.get_jobs()
+    def __init__(self, jobs_file_path, api_key, story_generator=None, score_cache_size=32, score_cache_ttl=300, score_cache_mb=None, scoring_workers=None, ann_candidates=None, change_log=None):
+        self.jobs_file_path = jobs_file_path
         self.semantic_matcher = SemanticMatcher()
+        data_handler = DataHandler(jobs_file_path)
+        self.catalog = CatalogSnapshot(data_handler, JobEmbeddingIndex(data_handler.get_store(), self.semantic_matcher))
+        self._update_lock = threading.Lock()
+        # With a CatalogChangeLog, admin changes are logged and every process applies
+        # them in log order (see `sync_changes`), starting with those already logged.
+        self.change_log = change_log
+        self._applied_change = 0
+        if change_log is not None:
+            self.catalog, _ = self._with_logged_changes(self.catalog)
         self.skills_scorer = SkillsScorer()
-        self.story_generator = StoryGenerator(api_key=api_key)
+        self.story_generator = story_generator or StoryGenerator(api_key=api_key)
+        # Raw scores per candidate profile, so weight-only changes skip scoring.
+        # An entry takes about 50 bytes per scored job (a 1M-job catalog: ~50 MB),
+        # so besides the entry count the cache is capped at SCORE_CACHE_MB in total.
+        if score_cache_mb is None:
+            score_cache_mb = float(os.environ.get('SCORE_CACHE_MB', '256'))
+        self.score_cache = LRUCache(max_size=score_cache_size, ttl=score_cache_ttl, max_weight=score_cache_mb * 1024 * 1024,
+                                    weigh=lambda entry: sum(array.nbytes for array in entry))
+        # Ranked snapshots behind get_recommendation_page cursors.
+        self.ranking_cache = LRUCache(max_size=256, ttl=600)
+        metrics.register_gauge('score_cache_hits', lambda: self.score_cache.hits, "Per-profile score cache hits.")
+        metrics.register_gauge('score_cache_misses', lambda: self.score_cache.misses, "Per-profile score cache misses.")
+        metrics.register_gauge('score_cache_bytes', lambda: self.score_cache.weight, "Memory held by the per-profile score cache.")
+        metrics.register_gauge('catalog_version', lambda: self.catalog.version, "Live job catalog version.")
+        # With SCORING_WORKERS > 1, catalogs of SCORING_SHARD_MIN_JOBS jobs or more are
+        # scored by that many processes over shared-memory copies of the job arrays.
+        if scoring_workers is None:
+            scoring_workers = int(os.environ.get('SCORING_WORKERS', '0'))
+        self.sharded_scorer = None
+        if scoring_workers > 1:
+            self.sharded_scorer = ShardedScorer(scoring_workers, min_jobs=int(os.environ.get('SCORING_SHARD_MIN_JOBS', '100000')))
+            if self.sharded_scorer.covers(self.catalog):
+                self.sharded_scorer.publish(self.catalog)
+        # With ANN_CANDIDATES > 0, catalogs of ANN_MIN_JOBS jobs or more are ranked in two
+        # stages: an IVF index picks about that many jobs near the candidate's title and
+        # skills, and only those get the full weighted scoring.
+        if ann_candidates is None:
+            ann_candidates = int(os.environ.get('ANN_CANDIDATES', '0'))
+        self.candidate_retriever = None
+        if ann_candidates > 0:
+            self.candidate_retriever = CandidateRetriever(
+                ann_candidates,
+                nprobe=int(os.environ.get('ANN_NPROBE', '16')),
+                nlist=int(os.environ['ANN_NLIST']) if os.environ.get('ANN_NLIST') else None,
+                min_jobs=int(os.environ.get('ANN_MIN_JOBS', '100000')),
+            )
+            if self.candidate_retriever.covers(self.catalog):
+                self.candidate_retriever.publish(self.catalog)
+
+    @property
+    def data_handler(self):
+        return self.catalog.data_handler
+
+    @property
+    def jobs(self):
+        return self.catalog.jobs
+
+    @property
+    def job_index(self):
+        return self.catalog.job_index
+
+    def update_catalog(self, upserts=None, deleted_ids=()):
+        """Applies job adds/updates (by job_id) and deletes, then swaps in the new version.
+
+        Only new or changed rows are indexed and encoded. Returns a summary
+        dict; raises ValueError for malformed upserts. With a change log, the
+        change is logged for the other processes once it has been checked.
+        """
+        with self._update_lock:
+            if self.change_log is None:
+                catalog, changed = self._changed_catalog(self.catalog, upserts, deleted_ids)
+            else:
+                # Logged and applied in the same form, so every process builds the same rows.
+                upserts = _change_records(upserts)
+                deleted_ids = list(deleted_ids)
+                with self.change_log.exclusive():
+                    # Catch up first, so this change lands after the same changes everywhere.
+                    self._sync_changes()
+                    catalog, changed = self._changed_catalog(self.catalog, upserts, deleted_ids)
+                    self._applied_change = self.change_log.append(upserts, deleted_ids)
+            self._swap_catalog(catalog)
+        data_handler = catalog.data_handler
+        return {"version": data_handler.version, "changed": len(changed), "jobs": len(data_handler.live_positions)}
+
+    def _changed_catalog(self, catalog, upserts, deleted_ids):
+        data_handler, changed = catalog.data_handler.with_changes(upserts, deleted_ids)
+        job_index = catalog.job_index.with_changes(data_handler.get_store(), changed)
+        return CatalogSnapshot(data_handler, job_index), changed
+
+    def sync_changes(self):
+        """Applies changes other processes have logged since the last call; returns how many."""
+        if self.change_log is None:
+            return 0
+        with self._update_lock:
+            return self._sync_changes()
+
+    def _sync_changes(self):
+        # Called with _update_lock held.
+        catalog, applied = self._with_logged_changes(self.catalog)
+        if applied:
+            self._swap_catalog(catalog)
+        return applied
+
+    def _with_logged_changes(self, catalog, after=None):
+        # Returns (catalog with the logged changes after `after` applied, how many there were).
+        changes = self.change_log.since(self._applied_change if after is None else after)
+        for seq, upserts, deleted_ids in changes:
+            try:
+                catalog, _ = self._changed_catalog(catalog, upserts, deleted_ids)
+            except (ValueError, TypeError) as e:
+                # Checked before it was logged, so this only happens with a hand-edited log.
+                print(f"Skipping catalog change {seq}: {e}")
+        if changes:
+            self._applied_change = changes[-1][0]
+        return catalog, len(changes)
+
+    def reload_catalog(self):
+        """Re-reads the catalog file and swaps it in; known texts come from the embedding cache.
+
+        With a change log, every logged change is applied again on top of the file.
+        Raises ValueError, keeping the current catalog live, if the file is
+        missing or holds no valid jobs.
+        """
+        with self._update_lock:
+            data_handler = DataHandler(self.jobs_file_path)
+            if not len(data_handler.live_positions):
+                # A missing, truncated or half-written file must not empty the live catalog.
+                raise ValueError(f"{self.jobs_file_path} has no valid jobs; keeping catalog version {self.catalog.version}.")
+            data_handler.version = self.catalog.version + 1
+            catalog = CatalogSnapshot(data_handler, JobEmbeddingIndex(data_handler.get_store(), self.semantic_matcher))
+            if self.change_log is not None:
+                catalog, _ = self._with_logged_changes(catalog, after=0)
+            self._swap_catalog(catalog)
+        return {"version": catalog.version, "jobs": len(catalog.data_handler.live_positions)}
+
+    def _swap_catalog(self, catalog):
+        if self.sharded_scorer is not None and self.sharded_scorer.covers(catalog):
+            # Publish before going live so the first request does not pay for the copy.
+            self.sharded_scorer.publish(catalog)
+        if self.candidate_retriever is not None and self.candidate_retriever.covers(catalog):
+            self.candidate_retriever.publish(catalog)
+        # A single attribute assignment, so readers see either the old or the new snapshot.
+        self.catalog = catalog
+        # Entries are keyed by version and can no longer be hit.
+        self.score_cache.clear()
+        self.ranking_cache.clear()
+        print(f"Job catalog version {catalog.version} is live ({len(catalog.data_handler.live_positions)} jobs).")
+
+    def watch_catalog(self, interval=5.0):
+        """Starts a daemon thread that reloads the catalog whenever its file changes."""
+        def signature():
+            try:
+                stat = os.stat(self.jobs_file_path)
+                return (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                return None
 
-    def _get_match_details(self, user_prefs, job_values, is_semantic=False, threshold=0.6):
+        def watch():
+            last_seen = signature()
+            while True:
+                time.sleep(interval)
+                current = signature()
+                if current is not None and current != last_seen:
+                    last_seen = current
+                    try:
+                        self.reload_catalog()
+                    except Exception as e:
+                        print(f"Error reloading job catalog: {e}")
+
+        thread = threading.Thread(target=watch, name='catalog-watcher', daemon=True)
+        thread.start()
+        return thread
+
+    def follow_changes(self, interval=1.0):
+        """Starts a daemon thread that applies other processes' logged changes every `interval` seconds."""
+        def follow():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sync_changes()
+                except Exception as e:
+                    print(f"Error applying logged catalog changes: {e}")
+
+        thread = threading.Thread(target=follow, name='catalog-changes', daemon=True)
+        thread.start()
+        return thread
+
+    def _get_match_details(self, user_prefs, job_values, similarity=None, threshold=0.6):
         details = []
         if not user_prefs:
             return [{'skill': s, 'type': 'none'} for s in job_values]
@@ -32,9 +255,8 @@ class Recommender:
             
             if norm_job_value in norm_user_prefs:
                 details.append({'skill': job_value, 'type': 'direct'})
-            elif is_semantic:
-                similarity = self.semantic_matcher.get_similarity(job_value, user_prefs)
-                if similarity > threshold:
+            elif similarity is not None:
+                if similarity(job_value) > threshold:
                     details.append({'skill': job_value, 'type': 'semantic'})
                 else:
                     details.append({'skill': job_value, 'type': 'none'})
@@ -43,91 +265,383 @@ class Recommender:
         return details
 
     def get_recommendations(self, preferences):
-        if self.jobs_df.empty:
-            return []
+        with metrics.stage('recommend'):
+            return self._recommend(preferences, top_k=5, with_stories=True)
 
+    def get_batch_recommendations(self, preferences_iter, top_k=5, with_stories=False, block_size=256):
+        """Yields the recommendations for each preference object, in input order.
+
+        Inputs are processed in blocks: all skills and first titles of a
+        block are encoded in one `encode` call and scored against the job
+        vocabularies with one matrix product each, then every candidate is
+        ranked with the same rules as `get_recommendations`. Only one block
+        is held in memory, and the per-profile score cache is bypassed so
+        bulk runs do not evict interactive entries.
+        """
+        block = []
+        for preferences in preferences_iter:
+            block.append(preferences)
+            if len(block) == block_size:
+                yield from self._recommend_block(block, top_k, with_stories)
+                block = []
+        if block:
+            yield from self._recommend_block(block, top_k, with_stories)
+
+    def _recommend_block(self, block, top_k, with_stories):
+        catalog = self.catalog
+        skill_columns, title_columns = {}, {}
+        for preferences in block:
+            candidate_prefs = preferences.get('preferences', {})
+            for skill in candidate_prefs.get('skills', []):
+                skill_columns.setdefault(skill, len(skill_columns))
+            for title in candidate_prefs.get('titles', [])[:1]:
+                title_columns.setdefault(title, len(title_columns))
+
+        vectors = self.semantic_matcher.encode(list(skill_columns) + list(title_columns))
+        skill_block_scores = title_block_scores = None
+        if vectors is not None:
+            skill_block_scores = catalog.job_index.skill_vocab_scores(vectors[:len(skill_columns)])
+            title_block_scores = catalog.job_index.title_vocab_scores(vectors[len(skill_columns):])
+
+        for preferences in block:
+            candidate_prefs = preferences.get('preferences', {})
+            skills = candidate_prefs.get('skills', [])
+            titles = candidate_prefs.get('titles', [])
+            vocab_scores = {
+                'skills': skill_block_scores[:, [skill_columns[s] for s in skills]] if skills and skill_block_scores is not None else None,
+                'titles': title_block_scores[:, title_columns[titles[0]]] if titles and title_block_scores is not None else None,
+            }
+            if vectors is not None:
+                vocab_scores['skill_vectors'] = vectors[[skill_columns[s] for s in skills]]
+                vocab_scores['title_vectors'] = vectors[[len(skill_columns) + title_columns[t] for t in titles[:1]]]
+            yield self._recommend(preferences, top_k, with_stories, vocab_scores=vocab_scores, use_cache=False, catalog=catalog)
+
+    def get_recommendation_page(self, preferences, limit=5, cursor=None):
+        """Returns one page of recommendations: {"results", "next_cursor", "total"}.
+
+        The first page ranks the catalog once and keeps the best
+        RANKED_SNAPSHOT_SIZE jobs as a short-lived snapshot for the query;
+        passing `next_cursor` back with the same preferences serves the next
+        page from that snapshot, so every page only builds the details and
+        stories of its own jobs. `total` counts all jobs above the match
+        threshold, though pages stop after RANKED_SNAPSHOT_SIZE of them.
+        A cursor from another query or a malformed one raises ValueError.
+        """
+        with metrics.stage('recommend.page'):
+            limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+            query = self._query_fingerprint(preferences)
+            version, offset = self.catalog.version, 0
+            if cursor:
+                cursor_query, version, offset = self._decode_cursor(cursor)
+                if cursor_query != query:
+                    raise ValueError("The cursor belongs to a different query.")
+
+            # Snapshots of a replaced catalog are dropped, so a stale cursor re-ranks on the live one.
+            snapshot = self.ranking_cache.get((query, version))
+            vocab_scores = None
+            candidate_prefs = preferences.get('preferences', {})
+            if snapshot is None:
+                catalog = self.catalog
+                vocab_scores = self._vocab_scores(catalog, candidate_prefs)
+                snapshot = self._ranked_snapshot(preferences, catalog, vocab_scores)
+                self.ranking_cache.put((query, snapshot[0].version), snapshot)
+            catalog, positions, raw_scores, final_scores, total = snapshot
+
+            page = slice(offset, offset + limit)
+            dynamic_weights = preferences.get('weights', {})
+            results = self._build_results(catalog, candidate_prefs, dynamic_weights, sum(dynamic_weights.values()),
+                                          positions[page], raw_scores[page], final_scores[page], with_stories=True, vocab_scores=vocab_scores)
+            next_cursor = None
+            if offset + limit < len(positions):
+                next_cursor = self._encode_cursor(query, catalog.version, offset + limit)
+            return {"results": results, "next_cursor": next_cursor, "total": total}
+
+    def _ranked_snapshot(self, preferences, catalog, vocab_scores=None):
+        # (catalog, positions, raw scores, final scores, total) of the query's best jobs, best first.
         candidate_prefs = preferences.get('preferences', {})
         dynamic_weights = preferences.get('weights', {})
+        total_weight = sum(dynamic_weights.values())
+        if catalog.jobs.empty or total_weight == 0:
+            return catalog, np.zeros(0, dtype=np.int64), np.zeros((0, len(SCORE_COMPONENTS))), np.zeros(0), 0
+        ranked = self._rank(catalog, candidate_prefs, self._normalized_preferences(candidate_prefs), dynamic_weights, total_weight, RANKED_SNAPSHOT_SIZE, vocab_scores)
+        return (catalog,) + ranked
 
-        norm_prefs = {
+    def _query_fingerprint(self, preferences):
+        query = json.dumps([preferences.get('preferences', {}), preferences.get('weights', {})], sort_keys=True, default=str)
+        return hashlib.sha256(query.encode('utf-8')).hexdigest()[:16]
+
+    def _encode_cursor(self, query, version, offset):
+        return base64.urlsafe_b64encode(json.dumps([query, version, offset]).encode('utf-8')).decode('ascii').rstrip('=')
+
+    def _decode_cursor(self, cursor):
+        try:
+            query, version, offset = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if not isinstance(offset, int) or not isinstance(version, int) or offset < 0:
+                raise ValueError
+            return query, version, offset
+        except (ValueError, TypeError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor.")
+
+    def _normalized_preferences(self, candidate_prefs):
+        return {
             'titles': {t.lower().strip() for t in candidate_prefs.get('titles', [])},
             'locations': {l.lower().strip() for l in candidate_prefs.get('locations', [])},
             'industries': {i.lower().strip() for i in candidate_prefs.get('industries', [])},
         }
 
-        results = []
-        for index, job in self.jobs_df.iterrows():
-            raw_scores = {
-                'skills': self.skills_scorer.calculate_score(
-                    candidate_prefs.get('skills', []),
-                    job['required_skills']
-                ),
-                'title': self.semantic_matcher.get_similarity(job['title'], candidate_prefs.get('titles', [])) * 100,
-                'location': self._score_list_overlap(norm_prefs['locations'], [job['location'].lower().strip()]),
-                'industry': self._score_list_overlap(norm_prefs['industries'], [job['industry'].lower().strip()]),
-                'salary': self._score_salary(candidate_prefs.get('min_salary'), job['salary_range'])
-            }
+    def _recommend(self, preferences, top_k, with_stories, vocab_scores=None, use_cache=True, catalog=None):
+        catalog = catalog or self.catalog
+        if catalog.jobs.empty:
+            return []
 
-            if raw_scores['location'] == 0 and norm_prefs['locations']:
-                continue
+        candidate_prefs = preferences.get('preferences', {})
+        dynamic_weights = preferences.get('weights', {})
+        norm_prefs = self._normalized_preferences(candidate_prefs)
 
-            total_weight = sum(dynamic_weights.values())
-            if total_weight == 0: continue
-            
-            final_score = 0
-            score_breakdown = {}
-            for key, display_name in {'skills': 'Skills', 'title': 'Title', 'location': 'Location', 'industry': 'Industry', 'salary': 'Salary'}.items():
-                contribution = (raw_scores[key] * dynamic_weights.get(key, 0)) / total_weight
-                final_score += contribution
-                score_breakdown[display_name] = round(contribution)
-
-            rounded_final_score = round(final_score)
-            if sum(score_breakdown.values()) != rounded_final_score and score_breakdown:
-                max_key = max(score_breakdown, key=score_breakdown.get)
-                score_breakdown[max_key] += (rounded_final_score - sum(score_breakdown.values()))
-
-            validation_details = {
-                'Skills': self._get_match_details(candidate_prefs.get('skills', []), job['required_skills'], is_semantic=True, threshold=0.5),
-                'Title': self._get_match_details(candidate_prefs.get('titles', []), [job['title']], is_semantic=True, threshold=0.6),
-                'Location': self._get_match_details(candidate_prefs.get('locations', []), [job['location']]),
-                'Industry': self._get_match_details(candidate_prefs.get('industries', []), [job['industry']]),
-                'Salary': f"₹{locale.format_string('%d', job['salary_range'][0], grouping=True)} - ₹{locale.format_string('%d', job['salary_range'][1], grouping=True)}"
-            }
+        total_weight = sum(dynamic_weights.values())
+        if total_weight == 0:
+            return []
 
-            if final_score > 40:
-                results.append({
-                    "job_id": job['job_id'],
-                    "job_title": job['title'],
-                    "company": job['company'],
-                    "location": job['location'],
-                    "match_score": rounded_final_score,
-                    "breakdown": score_breakdown,
-                    "validation_details": validation_details,
-                    "raw_job_details": job.to_dict()
-                })
-
-        sorted_results = sorted(results, key=lambda x: x['match_score'], reverse=True)
-        
-        final_results = []
-        for result in sorted_results[:5]: 
-            story = self.story_generator.generate_story(
-                candidate_prefs=candidate_prefs,
-                job_details=result['raw_job_details']
-            )
-            result['story'] = story
-            
-            del result['raw_job_details']
-            final_results.append(result)
+        if vocab_scores is None:
+            vocab_scores = self._vocab_scores(catalog, candidate_prefs)
+        positions, raw_scores, final_scores, _ = self._rank(catalog, candidate_prefs, norm_prefs, dynamic_weights, total_weight, top_k, vocab_scores, use_cache)
+        return self._build_results(catalog, candidate_prefs, dynamic_weights, total_weight, positions, raw_scores, final_scores, with_stories, vocab_scores)
+
+    def _rank(self, catalog, candidate_prefs, norm_prefs, dynamic_weights, total_weight, k, vocab_scores=None, use_cache=True):
+        """Returns (positions, raw_scores, final_scores, total) for the k best jobs, best first.
+
+        Picks them by partial selection over the scored jobs; `total` is the
+        number of jobs above the 40-point threshold (among the retrieved
+        candidates, when two-stage ranking applies).
+        """
+        if self.candidate_retriever is not None and self.candidate_retriever.covers(catalog):
+            ranked = self._rank_candidates(catalog, candidate_prefs, norm_prefs, dynamic_weights, total_weight, k, vocab_scores)
+            if ranked is not None:
+                return ranked
+
+        if self.sharded_scorer is not None and self.sharded_scorer.covers(catalog):
+            try:
+                with metrics.stage('recommend.sharded'):
+                    return self.sharded_scorer.top_k(catalog, candidate_prefs, norm_prefs, dynamic_weights, total_weight, k, vocab_scores)
+            except Exception as e:
+                print(f"Sharded scoring failed, scoring in-process instead: {e}")
+
+        positions, raw_scores = self._score_catalog(catalog, candidate_prefs, norm_prefs, dynamic_weights, total_weight, vocab_scores, use_cache)
+        return self._select(positions, raw_scores, dynamic_weights, total_weight, k)
+
+    def _select(self, positions, raw_scores, dynamic_weights, total_weight, k):
+        with metrics.stage('recommend.rank'):
+            final_scores = combine_scores(raw_scores, dynamic_weights, total_weight)
+            passing = np.flatnonzero(final_scores > 40)
+            top_rows = passing[select_top(np.round(final_scores[passing]), k)]
+        return positions[top_rows], raw_scores[top_rows], final_scores[top_rows], len(passing)
+
+    def _rank_candidates(self, catalog, candidate_prefs, norm_prefs, dynamic_weights, total_weight, k, vocab_scores=None):
+        # Two-stage `_rank`; None when the query has nothing to retrieve by. Retrieval
+        # uses the vectors `_vocab_scores` already encoded, so nothing is encoded here.
+        if not vocab_scores or vocab_scores.get('skill_vectors') is None:
+            return None
+        with metrics.stage('recommend.retrieve'):
+            data_handler = catalog.data_handler
+            allowed = data_handler.live
+            if norm_prefs['locations']:
+                allowed = np.zeros(len(data_handler.live), dtype=bool)
+                allowed[data_handler.positions_for(data_handler.location_index, norm_prefs['locations'])] = True
+            candidates = self.candidate_retriever.retrieve(catalog, vocab_scores['skill_vectors'], vocab_scores['title_vectors'], dynamic_weights, allowed)
+            if candidates is None:
+                return None
+        # Scores depend on the candidate set, so they bypass the per-profile cache.
+        positions, raw_scores = self._score_catalog(catalog, candidate_prefs, norm_prefs, dynamic_weights, total_weight, vocab_scores, use_cache=False, candidates=candidates)
+        return self._select(positions, raw_scores, dynamic_weights, total_weight, k)
+
+    def _build_results(self, catalog, candidate_prefs, dynamic_weights, total_weight, positions, raw_scores, final_scores, with_stories, vocab_scores=None):
+        with metrics.stage('recommend.details'):
+            similarity_lookups = self._similarity_lookups(catalog, candidate_prefs, vocab_scores) if len(positions) else {}
+            final_results = []
+            jobs = [catalog.jobs.row(position) for position in positions]
+            for job, job_raw_scores, final_score in zip(jobs, raw_scores, final_scores):
+                final_results.append(self._build_result(job, candidate_prefs, job_raw_scores, dynamic_weights, total_weight, final_score, similarity_lookups))
+
+        if with_stories:
+            with metrics.stage('recommend.stories'):
+                stories = self.story_generator.generate_stories(
+                    candidate_prefs=candidate_prefs,
+                    jobs_details=jobs
+                )
+            for result, story in zip(final_results, stories):
+                result['story'] = story
 
         return final_results
 
-    def _score_salary(self, min_salary_pref, salary_range_job):
-        if not min_salary_pref: return 100.0
-        return 100.0 if salary_range_job[1] >= min_salary_pref else 0.0
+    def _vocab_scores(self, catalog, candidate_prefs):
+        """Similarities of the candidate's skills and first title to the job vocabularies.
+
+        Encodes them in one call; scoring and the result details then share
+        the scores instead of encoding the same texts again. Returns a dict
+        like `_recommend_block` builds, or None if the model is unavailable.
+        """
+        skills = candidate_prefs.get('skills', [])
+        titles = candidate_prefs.get('titles', [])[:1]
+        vectors = self.semantic_matcher.encode(skills + titles)
+        if vectors is None:
+            return None
+        title_scores = catalog.job_index.title_vocab_scores(vectors[len(skills):]) if titles else None
+        return {
+            'skills': catalog.job_index.skill_vocab_scores(vectors[:len(skills)]) if skills else None,
+            'titles': None if title_scores is None else title_scores[:, 0],
+            # The vectors themselves, for two-stage ranking's retrieval.
+            'skill_vectors': vectors[:len(skills)],
+            'title_vectors': vectors[len(skills):],
+        }
+
+    def _similarity_lookups(self, catalog, candidate_prefs, vocab_scores=None):
+        # get_similarity(job_value, user_prefs) only ever compared against the first preference.
+        skills = candidate_prefs.get('skills', [])
+        titles = candidate_prefs.get('titles', [])
+        if vocab_scores is None:
+            vocab_scores = self._vocab_scores(catalog, candidate_prefs)
+        skill_scores = vocab_scores.get('skills') if vocab_scores else None
+        title_scores = vocab_scores.get('titles') if vocab_scores else None
+        return {
+            'Skills': catalog.job_index.skill_similarity_lookup(skills[0], None if skill_scores is None else skill_scores[:, 0]) if skills else None,
+            'Title': catalog.job_index.title_similarity_lookup(titles[0], title_scores) if titles else None,
+        }
+
+    def _build_result(self, job, candidate_prefs, job_raw_scores, dynamic_weights, total_weight, final_score, similarity_lookups):
+        score_breakdown = {}
+        for key, raw_score in zip(SCORE_COMPONENTS, job_raw_scores):
+            contribution = (float(raw_score) * dynamic_weights.get(key, 0)) / total_weight
+            score_breakdown[SCORE_DISPLAY_NAMES[key]] = round(contribution)
+
+        rounded_final_score = round(float(final_score))
+        if sum(score_breakdown.values()) != rounded_final_score and score_breakdown:
+            max_key = max(score_breakdown, key=score_breakdown.get)
+            score_breakdown[max_key] += (rounded_final_score - sum(score_breakdown.values()))
+
+        validation_details = {
+            'Skills': self._get_match_details(candidate_prefs.get('skills', []), job['required_skills'], similarity=similarity_lookups.get('Skills'), threshold=0.5),
+            'Title': self._get_match_details(candidate_prefs.get('titles', []), [job['title']], similarity=similarity_lookups.get('Title'), threshold=0.6),
+            'Location': self._get_match_details(candidate_prefs.get('locations', []), [job['location']]),
+            'Industry': self._get_match_details(candidate_prefs.get('industries', []), [job['industry']]),
+            'Salary': f"₹{locale.format_string('%d', job['salary_range'][0], grouping=True)} - ₹{locale.format_string('%d', job['salary_range'][1], grouping=True)}"
+        }
+
+        return {
+            "job_id": job['job_id'],
+            "job_title": job['title'],
+            "company": job['company'],
+            "location": job['location'],
+            "match_score": rounded_final_score,
+            "breakdown": score_breakdown,
+            "validation_details": validation_details,
+        }
+
+    def _profile_fingerprint(self, catalog, candidate_prefs, norm_prefs):
+        # Only what the raw scores depend on: skills as a multiset, the first
+        # title, normalized location/industry sets and the salary floor.
+        return json.dumps([
+            catalog.version,
+            sorted(candidate_prefs.get('skills', [])),
+            candidate_prefs.get('titles', [])[:1],
+            sorted(norm_prefs['locations']),
+            sorted(norm_prefs['industries']),
+            candidate_prefs.get('min_salary') or None,
+        ])
+
+    def _score_catalog(self, catalog, candidate_prefs, norm_prefs, dynamic_weights=None, total_weight=None, vocab_scores=None, use_cache=True, candidates=None):
+        """Scores the jobs that pass the location filter.
+
+        Returns (positions, raw_scores): sorted catalog positions and their
+        raw 0-100 scores, one column per SCORE_COMPONENTS entry. Location,
+        industry and salary come from DataHandler's inverted indexes first;
+        when weights are given, jobs that cannot clear the 40-point threshold
+        whatever their skills and title scores are left out, and their
+        semantic scoring is skipped.
+
+        Raw scores do not depend on weights, so they are cached per candidate
+        profile; later calls only fill in semantic scores for jobs that new
+        weights make reachable. `vocab_scores` carries precomputed candidate
+        similarities to the job vocabularies (see `_recommend_block`).
+        `candidates`, sorted live positions that already pass the location
+        filter, limits scoring to those jobs.
+        """
+        entry = None
+        if use_cache:
+            cache_key = self._profile_fingerprint(catalog, candidate_prefs, norm_prefs)
+            entry = self.score_cache.get(cache_key)
+        if entry is None:
+            with metrics.stage('recommend.filter'):
+                entry = self._score_filters(catalog, candidate_prefs, norm_prefs, candidates)
+            if use_cache:
+                self.score_cache.put(cache_key, entry)
+        positions, raw_scores, scored = entry
+
+        if dynamic_weights is None:
+            reachable = np.ones(len(positions), dtype=bool)
+        else:
+            reachable = can_pass_threshold(raw_scores, dynamic_weights, total_weight)
+
+        unscored = reachable & ~scored
+        if unscored.any():
+            with metrics.stage('recommend.semantic'):
+                self._score_semantic(catalog, candidate_prefs, positions, raw_scores, np.flatnonzero(unscored), vocab_scores)
+            scored |= unscored
+
+        if reachable.all():
+            return positions, raw_scores
+        return positions[reachable], np.asfortranarray(raw_scores[reachable])
+
+    def _score_filters(self, catalog, candidate_prefs, norm_prefs, candidates=None):
+        data_handler = catalog.data_handler
+        if candidates is not None:
+            positions = candidates
+        elif norm_prefs['locations']:
+            positions = data_handler.positions_for(data_handler.location_index, norm_prefs['locations'])
+        else:
+            positions = data_handler.live_positions
+
+        # Column-major so each component is a contiguous array.
+        raw_scores = np.empty((len(positions), len(SCORE_COMPONENTS)), order='F')
+        raw_scores[:, 2] = self._score_list_overlap(data_handler, norm_prefs['locations'], data_handler.location_index, positions)
+        raw_scores[:, 3] = self._score_list_overlap(data_handler, norm_prefs['industries'], data_handler.industry_index, positions)
+        raw_scores[:, 4] = self._score_salary(data_handler, candidate_prefs.get('min_salary'), positions)
+        scored = np.zeros(len(positions), dtype=bool)
+        return positions, raw_scores, scored
+
+    def _score_semantic(self, catalog, candidate_prefs, positions, raw_scores, rows, vocab_scores=None):
+        # Fills the skills and title columns of `raw_scores` for `rows`.
+        job_index = catalog.job_index
+        candidate_skills = candidate_prefs.get('skills', [])
+        job_set_ids = job_index.skill_set_ids[positions[rows]]
+        used_sets = np.zeros(len(job_index.skill_set_sizes), dtype=bool)
+        used_sets[job_set_ids] = True
+        set_ids = np.flatnonzero(used_sets)
+
+        skill_set_scores = np.zeros(len(used_sets))
+        skill_set_scores[set_ids] = self.skills_scorer.calculate_scores(
+            candidate_skills,
+            job_index.skill_set_sizes[set_ids],
+            job_index.skill_set_overlaps(candidate_skills, set_ids),
+            job_index.skill_set_scores(candidate_skills, set_ids, vocab_scores.get('skills') if vocab_scores else None)
+        )
+        raw_scores[rows, 0] = skill_set_scores[job_set_ids]
+        title_scores = job_index.title_scores(candidate_prefs.get('titles', []), positions[rows], vocab_scores.get('titles') if vocab_scores else None)
+        raw_scores[rows, 1] = title_scores.astype(np.float64) * 100
+
+    def _score_salary(self, data_handler, min_salary_pref, positions):
+        if not min_salary_pref:
+            return np.full(len(positions), 100.0)
+        return np.where(data_handler.salary_max[positions] >= min_salary_pref, 100.0, 0.0)
         
-    def _score_list_overlap(self, set_pref, list_job_values):
-        if not set_pref: return 100.0
-        set_job = set(list_job_values)
-        intersection = len(set_pref.intersection(set_job))
-        union = len(set_pref.union(set_job))
-        return (intersection / union) * 100 if union > 0 else 0.0
+    def _score_list_overlap(self, data_handler, set_pref, index, positions):
+        if not set_pref:
+            return np.full(len(positions), 100.0)
+        # Each job has a single value, so the Jaccard overlap is 1/len(set_pref) on a hit.
+        if len(positions) * 16 < len(data_handler.jobs):
+            # A few retrieved candidates: look them up rather than marking the whole catalog.
+            matched = data_handler.has_any(index, set_pref, positions)
+        else:
+            matched = np.zeros(len(data_handler.jobs), dtype=bool)
+            matched[data_handler.positions_for(index, set_pref)] = True
+            matched = matched[positions]
+        return np.where(matched, (1 / len(set_pref)) * 100, 0.0)
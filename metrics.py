@@ -0,0 +1,150 @@
+# file: metrics.py
+
+import bisect
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+class MetricsRegistry:
+    """Stage latency histograms, labelled counters and callback gauges.
+
+    Everything is a no-op until `enable()` is called: `stage()` hands back
+    a shared do-nothing context manager and `inc()`/`observe()` return
+    straight away, so instrumented code costs one attribute check when
+    metrics are off. `render()` produces the Prometheus text format.
+
+    With `server_timing` on, stage durations observed on a thread between
+    `start_trace()` and `end_trace()` are also summed per stage, for a
+    per-request Server-Timing header.
+    """
+
+    def __init__(self, prefix='credx'):
+        self.prefix = prefix
+        self.enabled = False
+        self.server_timing = False
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._local = threading.local()
+
+    def enable(self, server_timing=False):
+        self.enabled = True
+        self.server_timing = server_timing
+
+    def disable(self):
+        self.enabled = False
+        self.server_timing = False
+
+    def stage(self, name):
+        """Context manager timing one pipeline stage."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * (len(BUCKETS) + 1), 0.0]
+            histogram[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram[1] += seconds
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace[name] = trace.get(name, 0.0) + seconds
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register_gauge(self, name, callback, help_text=''):
+        """Reports `callback()` as gauge `name` on every scrape (replaces any earlier one)."""
+        self._gauges[name] = (callback, help_text)
+
+    def start_trace(self):
+        self._local.trace = {} if self.server_timing else None
+
+    def end_trace(self):
+        """Returns {stage: seconds} observed on this thread since `start_trace`."""
+        trace = getattr(self._local, 'trace', None)
+        self._local.trace = None
+        return trace or {}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = {name: (list(counts), total) for name, (counts, total) in self._histograms.items()}
+            counters = dict(self._counters)
+
+        family = f"{self.prefix}_stage_seconds"
+        lines += [f"# HELP {family} Time spent in each pipeline stage.", f"# TYPE {family} histogram"]
+        for name in sorted(histograms):
+            counts, total = histograms[name]
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{family}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{family}_sum{{stage="{name}"}} {total}')
+            lines.append(f'{family}_count{{stage="{name}"}} {cumulative}')
+
+        for name in sorted({name for name, _ in counters}):
+            family = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {family} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    label_text = ",".join(f'{key}="{label_value}"' for key, label_value in labels)
+                    lines.append(f"{family}{{{label_text}}} {value}" if label_text else f"{family} {value}")
+
+        for name, (callback, help_text) in sorted(self._gauges.items()):
+            try:
+                value = callback()
+            except Exception as e:
+                print(f"Error reading gauge {name}: {e}")
+                continue
+            family = f"{self.prefix}_{name}"
+            if help_text:
+                lines.append(f"# HELP {family} {help_text}")
+            lines += [f"# TYPE {family} gauge", f"{family} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def server_timing_header(self, trace):
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in trace.items())
+
+metrics = MetricsRegistry()
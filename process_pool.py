@@ -0,0 +1,52 @@
+# file: process_pool.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from metrics import metrics
+
+def _init_worker():
+    # Stage timings recorded in a pool process would never be scraped.
+    metrics.disable()
+
+class ForkedProcessPool:
+    """A `ProcessPoolExecutor` of `workers` processes, started on first use in each process.
+
+    Pools do not survive a fork (preloaded gunicorn workers), so a process
+    other than the one that started the pool gets a new one. By first use
+    the process is running request and background threads, and forking it
+    directly could copy a lock some other thread holds into a worker, which
+    then deadlocks. Workers are therefore forked from a single-threaded fork
+    server. It imports the main script once, as `__mp_main__`, so scripts
+    must keep their start-up work out of that import (see app.py).
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker)
+                self._pid = os.getpid()
+            return self._executor
+
+    @contextmanager
+    def use(self):
+        """Yields the executor; if a worker died meanwhile, the next use starts a fresh pool."""
+        executor = self.executor()
+        try:
+            yield executor
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
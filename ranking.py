@@ -0,0 +1,34 @@
+# file: ranking.py
+
+import numpy as np
+
+SCORE_COMPONENTS = ('skills', 'title', 'location', 'industry', 'salary')
+
+def can_pass_threshold(raw_scores, dynamic_weights, total_weight):
+    # Upper bound on the final score, taking skills and title at their 100-point maximum.
+    weights = [dynamic_weights.get(key, 0) for key in SCORE_COMPONENTS]
+    if total_weight <= 0 or min(weights) < 0:
+        return np.ones(len(raw_scores), dtype=bool)
+
+    ceiling = np.zeros(len(raw_scores))
+    for column, weight in enumerate(weights):
+        column_scores = 100.0 if SCORE_COMPONENTS[column] in ('skills', 'title') else raw_scores[:, column]
+        ceiling += (column_scores * weight) / total_weight
+    # The margin covers float32 cosine scores that land a hair above 1.0.
+    return ceiling > 40 - 0.01
+
+def combine_scores(raw_scores, dynamic_weights, total_weight):
+    final_scores = np.zeros(len(raw_scores))
+    for column, key in enumerate(SCORE_COMPONENTS):
+        final_scores += (raw_scores[:, column] * dynamic_weights.get(key, 0)) / total_weight
+    return final_scores
+
+def select_top(scores, k):
+    """Positions of the k highest scores; ties keep catalog order like a stable sort."""
+    if len(scores) > k:
+        kth_score = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates = np.flatnonzero(scores >= kth_score)
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]]
@@ -1,39 +1,84 @@
 # file: resume_parser.py
 
+import hashlib
 import os
 import json
+import unicodedata
+from caching import LRUCache, SQLiteLRUCache
+from genai_client import GenAIClient
+from metrics import metrics
 try:
     import fitz
 except ImportError:
     fitz = None
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+
+def extract_page_range(data, start, stop):
+    """Text of pages [start, stop) of the PDF bytes `data`; a module-level function so worker processes can run it."""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return "".join(doc[i].get_text() for i in range(start, min(stop, doc.page_count)))
 
 class ResumeParser:
-    def __init__(self, api_key):
+    """Extracts skills, titles, locations and industries from resume PDFs with an LLM.
+
+    Successful results are cached twice: by the SHA-256 of the PDF bytes,
+    so a re-uploaded file skips both text extraction and the LLM, and by
+    the SHA-256 of the whitespace-normalized text, so a re-exported copy of
+    the same resume skips the LLM. With `cache_path` both levels live in
+    one SQLite file (shared by workers and kept across restarts), else in
+    memory; each keeps at most `cache_size` entries, least recently used
+    evicted first.
+
+    Uploads over `max_bytes` are refused, and only the first `max_pages`
+    pages of a PDF are read.
+    """
+
+    def __init__(self, api_key, model_factory=None, cache_size=1000, cache_path=None, max_pages=20, max_bytes=10 * 1024 * 1024):
         if fitz is None:
             print("WARNING: PyMuPDF (fitz) is not installed. PDF parsing will be disabled.")
-        if genai is None:
+        self.genai = GenAIClient(api_key, model_factory)
+        if self.genai.sdk_missing():
             print("WARNING: Google Generative AI SDK is not installed. Resume parsing will be disabled.")
-        self.api_key = api_key
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        if cache_path:
+            self.file_cache = SQLiteLRUCache(cache_path, max_size=cache_size, table='resume_files')
+            self.text_cache = SQLiteLRUCache(cache_path, max_size=cache_size, table='resume_texts')
+        else:
+            self.file_cache = LRUCache(max_size=cache_size)
+            self.text_cache = LRUCache(max_size=cache_size)
+        metrics.register_gauge('resume_file_cache_hits', lambda: self.file_cache.hits, "Resume uploads answered from the PDF-hash cache.")
+        metrics.register_gauge('resume_file_cache_misses', lambda: self.file_cache.misses, "Resume uploads not in the PDF-hash cache.")
+        metrics.register_gauge('resume_text_cache_hits', lambda: self.text_cache.hits, "Resumes answered from the extracted-text cache.")
+        metrics.register_gauge('resume_text_cache_misses', lambda: self.text_cache.misses, "Resumes sent to the LLM after missing both caches.")
+
+    def cache_stats(self):
+        return {
+            "file": {"hits": self.file_cache.hits, "misses": self.file_cache.misses},
+            "text": {"hits": self.text_cache.hits, "misses": self.text_cache.misses},
+        }
+
+    def page_count(self, data):
+        """Number of pages of the PDF that will be read, at most `max_pages`; 0 if it cannot be opened."""
+        if not fitz:
+            return 0
+        try:
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                return min(doc.page_count, self.max_pages)
+        except Exception as e:
+            print(f"Error opening PDF: {e}")
+            return 0
 
-    def _extract_text_from_pdf(self, file_stream):
+    def _extract_text_from_pdf(self, data):
         if not fitz:
             return None
         try:
-            doc = fitz.open(stream=file_stream.read(), filetype="pdf")
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            return text
+            return extract_page_range(data, 0, self.max_pages)
         except Exception as e:
             print(f"Error extracting text from PDF: {e}")
             return None
 
     def _analyze_text_with_llm(self, text):
-        if not self.api_key or self.api_key == "YOUR_API_KEY_HERE" or not genai:
+        if not self.genai.available():
             return {"error": "AI client not configured in app.py."}
 
         prompt = f"""
@@ -46,20 +91,62 @@ class ResumeParser:
         """
         
         try:
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            generation_config = genai.types.GenerationConfig(response_mime_type="application/json")
+            model = self.genai.new_model()
+            generation_config = {"response_mime_type": "application/json"}
             
-            response = model.generate_content([prompt, text], generation_config=generation_config)
+            with metrics.stage('resume.llm'):
+                response = model.generate_content([prompt, text], generation_config=generation_config)
             
-            return json.loads(response.text)
+            result = json.loads(response.text)
         except Exception as e:
             print(f"Error calling Gemini API in ResumeParser: {e}")
+            metrics.inc('llm_requests', component='resume', outcome='error')
             return {"error": "Failed to analyze resume with AI."}
+        metrics.inc('llm_requests', component='resume', outcome='ok')
+        return result
 
-    def parse(self, file):
-        if not fitz or not genai:
-            return {"error": "A required library is not installed on the server."}
-        text = self._extract_text_from_pdf(file)
+    def _text_key(self, text):
+        # Re-exports of the same resume differ in whitespace and Unicode forms, not in content.
+        normalized = " ".join(unicodedata.normalize('NFKC', text).split())
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def too_large(self, data):
+        return len(data) > self.max_bytes
+
+    def cached(self, data):
+        """Returns (file_key, cached result or None) for the PDF bytes `data`."""
+        file_key = hashlib.sha256(data).hexdigest()
+        return file_key, self.file_cache.get(file_key)
+
+    def analyze(self, text, file_key):
+        """Turns extracted resume text into a profile and caches it under the text and `file_key`."""
         if not text:
             return {"error": "Could not extract text from the resume PDF."}
-        return self._analyze_text_with_llm(text)
+        text_key = self._text_key(text)
+        result = self.text_cache.get(text_key)
+        if result is None:
+            result = self._analyze_text_with_llm(text)
+            # Failures are not cached, so the next upload retries.
+            if not isinstance(result, dict) or "error" in result:
+                return result
+            self.text_cache.put(text_key, result)
+        self.file_cache.put(file_key, result)
+        return result
+
+    def libraries_missing(self):
+        return not fitz or self.genai.sdk_missing()
+
+    def parse(self, file):
+        if self.libraries_missing():
+            return {"error": "A required library is not installed on the server."}
+        with metrics.stage('resume.parse'):
+            data = file.read(self.max_bytes + 1)
+            if self.too_large(data):
+                return {"error": f"The resume is larger than {self.max_bytes // (1024 * 1024)} MB."}
+            file_key, result = self.cached(data)
+            if result is not None:
+                return result
+
+            with metrics.stage('resume.extract'):
+                text = self._extract_text_from_pdf(data)
+            return self.analyze(text, file_key)
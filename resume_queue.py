@@ -0,0 +1,135 @@
+# file: resume_queue.py
+
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from metrics import metrics
+from process_pool import ForkedProcessPool
+from resume_parser import extract_page_range
+
+class ResumeQueue:
+    """Parses uploaded resumes in the background so uploads return at once.
+
+    `submit` stores the job and hands back its id; `status` reports
+    queued / extracting (with pages done) / analyzing / done / failed.
+    Text extraction runs page-parallel in a pool of `extract_workers`
+    processes, `pages_per_task` pages per task, since PyMuPDF holds the
+    GIL; the LLM call, which only waits on the network, runs on one of
+    `llm_workers` threads. Job states live in `store` (an `LRUCache` or a
+    `SQLiteLRUCache`, the latter visible to every gunicorn worker).
+
+    At most `max_pending` jobs are queued or running per process; past
+    that `submit` returns None and the caller should send 429 with
+    `retry_after()`.
+    """
+
+    def __init__(self, parser, store, max_pending=16, llm_workers=4, extract_workers=2, pages_per_task=4):
+        self.parser = parser
+        self.store = store
+        self.max_pending = max_pending
+        self.llm_workers = llm_workers
+        self.extract_workers = extract_workers
+        self.pages_per_task = pages_per_task
+        self.pending = 0
+        self._durations = deque(maxlen=50)
+        self._lock = threading.Lock()
+        self._threads = None
+        self._pid = None
+        self._processes = ForkedProcessPool(extract_workers)
+        metrics.register_gauge('resume_queue_pending', lambda: self.pending, "Resume jobs queued or running in this process.")
+
+    def _thread_pool(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads do not survive a fork (preloaded gunicorn workers), so each process starts its own.
+                self._threads = ThreadPoolExecutor(max_workers=self.llm_workers, thread_name_prefix='resume')
+                self._pid = os.getpid()
+            return self._threads
+
+    def retry_after(self):
+        """Seconds until a slot is likely to free up, from recent job durations."""
+        with self._lock:
+            average = sum(self._durations) / len(self._durations) if self._durations else 5.0
+            waiting = self.pending
+        return max(1, min(60, math.ceil(average * waiting / self.llm_workers)))
+
+    def submit(self, data):
+        """Queues the PDF bytes `data`; returns the job id, or None if the queue is full."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                metrics.inc('resume_jobs', outcome='rejected')
+                return None
+            self.pending += 1
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.put(job_id, {"status": "queued"})
+            self._thread_pool().submit(self._run, job_id, data)
+        except BaseException:
+            # Nothing was queued, so give the slot back.
+            with self._lock:
+                self.pending -= 1
+            raise
+        metrics.inc('resume_jobs', outcome='accepted')
+        return job_id
+
+    def status(self, job_id):
+        """The job's state dict, or None for an unknown or expired id."""
+        return self.store.get(job_id)
+
+    def _run(self, job_id, data):
+        start = time.perf_counter()
+        try:
+            self.store.put(job_id, self._outcome(job_id, data))
+        except Exception as e:
+            # The store write failed (e.g. "database is locked"); the slot is still freed below.
+            print(f"Error saving resume job {job_id}: {e}")
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self._durations.append(time.perf_counter() - start)
+
+    def _outcome(self, job_id, data):
+        try:
+            with metrics.stage('resume.parse'):
+                result = self._parse(job_id, data)
+        except Exception as e:
+            print(f"Error processing resume job {job_id}: {e}")
+            result = {"error": "Failed to parse the resume."}
+        if isinstance(result, dict) and "error" not in result:
+            return {"status": "done", "result": result}
+        return {"status": "failed", "error": result.get("error") if isinstance(result, dict) else str(result)}
+
+    def _parse(self, job_id, data):
+        if self.parser.libraries_missing():
+            return {"error": "A required library is not installed on the server."}
+        file_key, result = self.parser.cached(data)
+        if result is not None:
+            return result
+        with metrics.stage('resume.extract'):
+            text = self._extract(job_id, data)
+        self.store.put(job_id, {"status": "analyzing"})
+        return self.parser.analyze(text, file_key)
+
+    def _extract(self, job_id, data):
+        pages = self.parser.page_count(data)
+        ranges = [(start, min(start + self.pages_per_task, pages)) for start in range(0, pages, self.pages_per_task)]
+        self.store.put(job_id, {"status": "extracting", "pages_done": 0, "pages": pages})
+        parts = []
+        try:
+            with self._processes.use() as processes:
+                futures = [processes.submit(extract_page_range, data, start, stop) for start, stop in ranges]
+                for future, (_, stop) in zip(futures, ranges):
+                    parts.append(future.result())
+                    self.store.put(job_id, {"status": "extracting", "pages_done": stop, "pages": pages})
+        except BrokenProcessPool:
+            # Fails the job; the pool is replaced on its next use.
+            raise
+        except Exception as e:
+            print(f"Error extracting text from PDF: {e}")
+            return None
+        return "".join(parts)
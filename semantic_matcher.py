@@ -1,41 +1,167 @@
 # file: semantic_matcher.py
 
-from sentence_transformers import SentenceTransformer, util
-import torch
+import numpy as np
+import os
+from embedding_store import EmbeddingStore
+from encode_batcher import EncodeBatcher
+from encoder_backends import load_sentence_transformer, set_torch_threads
+from metrics import metrics
 
 class SemanticMatcher:
+    MODEL_NAME = 'all-MiniLM-L6-v2'
+    # 'float32' or 'int8' (dynamically quantized, faster on CPU); see encoder_backends.py.
+    BACKEND = os.environ.get('ENCODER_BACKEND', 'float32')
+    # Intra-op threads torch may use per process; 0 keeps torch's default (all cores).
+    THREADS = int(os.environ.get('ENCODER_THREADS', '0'))
+    # Set EMBEDDING_CACHE_DIR to an empty string to disable the on-disk cache.
+    CACHE_DIR = os.environ.get('EMBEDDING_CACHE_DIR', os.path.join('data', 'embedding_cache'))
+    # Called with MODEL_NAME to create the encoder; anything with SentenceTransformer's
+    # `encode` and `get_sentence_embedding_dimension` works (see fake_encoder.py).
+    # Set it before the first SemanticMatcher is created; BACKEND and THREADS then do not
+    # apply. The on-disk cache is keyed by cache_name(), so give a substitute encoder
+    # its own name or disable the cache.
+    model_factory = None
+    # With a window above zero, concurrent encode calls of fewer than BATCH_SIZE
+    # texts are coalesced into one model call; each call waits at most
+    # BATCH_WINDOW_MS for others to join. Worth enabling under threaded serving.
+    BATCH_WINDOW_MS = float(os.environ.get('ENCODE_BATCH_WINDOW_MS', '0'))
+    BATCH_SIZE = int(os.environ.get('ENCODE_BATCH_SIZE', '64'))
+
     _instance = None
     _model = None
+    _store = None
+    _batcher = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SemanticMatcher, cls).__new__(cls)
             try:
-                cls._model = SentenceTransformer('all-MiniLM-L6-v2')
+                if cls.model_factory is not None:
+                    cls._model = cls.model_factory(cls.MODEL_NAME)
+                else:
+                    cls._model = load_sentence_transformer(cls.MODEL_NAME, cls.BACKEND, cls.THREADS)
                 print("Semantic model loaded successfully.")
             except Exception as e:
                 print(f"Error loading sentence-transformer model: {e}")
                 cls._model = None
+            cls._store = cls._open_store()
+            if cls._model and cls.BATCH_WINDOW_MS > 0:
+                cls._batcher = EncodeBatcher(cls._instance._run_model, cls.BATCH_SIZE, cls.BATCH_WINDOW_MS)
+                metrics.register_gauge('encode_batches', lambda: cls._batcher.batches, "Batched model calls made for concurrent encodes.")
+                metrics.register_gauge('encode_batched_requests', lambda: cls._batcher.requests, "Encode calls served by batched model calls.")
         return cls._instance
 
+    @classmethod
+    def _open_store(cls):
+        if not cls._model or not cls.CACHE_DIR:
+            return None
+        try:
+            return EmbeddingStore(cls.CACHE_DIR, cls.cache_name(), cls._model.get_sentence_embedding_dimension())
+        except Exception as e:
+            print(f"Error opening embedding cache, continuing without it: {e}")
+            return None
+
+    @classmethod
+    def cache_name(cls):
+        # Quantized vectors differ slightly, so they must not share a cache file with float32 ones.
+        return cls.MODEL_NAME if cls.BACKEND == 'float32' else f"{cls.MODEL_NAME}-{cls.BACKEND}"
+
+    @classmethod
+    def apply_thread_count(cls):
+        """Re-applies THREADS in this process; forked workers call it so the setting holds there too."""
+        set_torch_threads(cls.THREADS)
+
+    def warm_up(self):
+        """Runs one encode straight through the model, bypassing the cache.
+
+        The first call into a freshly loaded model initializes tokenizer and
+        kernel state; doing it at startup keeps that off the first request
+        and, before a fork, lets workers inherit it. Returns True on success.
+        """
+        if not self._model:
+            return False
+        try:
+            # Straight to the model, so no batcher thread is started before a fork.
+            self._run_model(["warm-up"])
+            return True
+        except Exception as e:
+            print(f"Error warming up the semantic model: {e}")
+            return False
+
+    def encode(self, texts):
+        """Encodes a list of texts into L2-normalized float32 row vectors.
+
+        Dot products between these rows are cosine similarities, so callers can
+        score many texts with one matrix product. Texts already in the
+        on-disk cache are not re-encoded; if the cache fails, texts go to the
+        model. Returns None when the model is unavailable or encoding fails.
+        """
+        if not self._model or not texts:
+            return None
+
+        texts = list(texts)
+        if self._store is None:
+            return self._encode_with_model(texts)
+
+        try:
+            vectors, missing = self._store.lookup(texts)
+        except Exception as e:
+            print(f"Error reading the embedding cache, encoding without it: {e}")
+            return self._encode_with_model(texts)
+        metrics.inc('embedding_cache_lookups', len(texts) - len(missing), result='hit')
+        metrics.inc('embedding_cache_lookups', len(missing), result='miss')
+        if missing:
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            new_vectors = self._encode_with_model(missing_texts)
+            if new_vectors is None:
+                return None
+            try:
+                self._store.add(missing_texts, new_vectors)
+            except Exception as e:
+                # E.g. a full disk or read-only volume: the vectors are still good to return.
+                print(f"Error writing to the embedding cache: {e}")
+            rows = {text: row for row, text in enumerate(missing_texts)}
+            for i in missing:
+                vectors[i] = new_vectors[rows[texts[i]]]
+        return vectors
+
+    def _encode_with_model(self, texts):
+        try:
+            with metrics.stage('encode'):
+                # Large calls (catalog indexing) are a full batch on their own.
+                if self._batcher is not None and len(texts) < self._batcher.max_batch_size:
+                    return self._batcher.encode(texts)
+                return self._run_model(texts)
+        except Exception as e:
+            print(f"Error encoding texts: {e}")
+            return None
+
+    def _run_model(self, texts):
+        metrics.inc('encoder_calls')
+        metrics.inc('encoder_texts', len(texts))
+        with metrics.stage('encode.model'):
+            embeddings = self._model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
     def get_similarity(self, text1, text2):
         if not self._model or not text1 or not text2:
             return 0.0
             
-        try:
-            embedding1 = self._model.encode(text1, convert_to_tensor=True)
-            embedding2 = self._model.encode(text2, convert_to_tensor=True)
+        with metrics.stage('similarity'):
+            try:
+                embedding1 = self._encode_with_model(text1 if isinstance(text1, list) else [text1])
+                embedding2 = self._encode_with_model(text2 if isinstance(text2, list) else [text2])
             
-            cosine_scores = util.cos_sim(embedding1, embedding2)
+                cosine_scores = embedding1 @ embedding2.T
             
-            if isinstance(text1, list):
-                if len(text1) == 0:
-                    return 0.0
-                max_scores = torch.max(cosine_scores, dim=1).values
-                return torch.mean(max_scores).item()
-            else:
-                return cosine_scores[0][0].item()
+                if isinstance(text1, list):
+                    if len(text1) == 0:
+                        return 0.0
+                    max_scores = cosine_scores.max(axis=1)
+                    return float(max_scores.mean())
+                else:
+                    return float(cosine_scores[0][0])
 
-        except Exception as e:
-            print(f"Error calculating similarity: {e}")
-            return 0.0
+            except Exception as e:
+                print(f"Error calculating similarity: {e}")
+                return 0.0
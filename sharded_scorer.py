@@ -0,0 +1,234 @@
+# file: sharded_scorer.py
+
+import os
+import threading
+import uuid
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+from job_index import skill_set_segments
+from process_pool import ForkedProcessPool
+from ranking import SCORE_COMPONENTS, can_pass_threshold, combine_scores, select_top
+from skills_scorer import SkillsScorer
+
+def _normalized_codes(jobs, col):
+    """Per-job ids of the lower-cased, stripped values of `col`, and a value -> id lookup.
+
+    Missing values get id len(lookup), so per-request tables carry one
+    trailing always-False slot for them.
+    """
+    if col not in jobs.categorical:
+        return np.zeros(len(jobs), dtype=np.int32), {}
+    codes, categories = jobs.categorical[col]
+    lookup, category_ids = {}, []
+    for category in categories:
+        category_ids.append(lookup.setdefault(category.lower().strip(), len(lookup)))
+    category_ids.append(len(lookup))
+    return np.array(category_ids, dtype=np.int32)[codes], lookup
+
+def _release(segments, owner_pid):
+    # Forked copies of this object (e.g. gunicorn workers) must not unlink the owner's segments.
+    if os.getpid() != owner_pid:
+        return
+    for segment in segments:
+        segment.close()
+        segment.unlink()
+
+class SharedCatalogArrays:
+    """The per-job arrays scoring needs for one catalog version, in shared memory.
+
+    Shard workers map the segments named in `spec` instead of receiving job
+    data with every request. The segments are unlinked when this object
+    is garbage collected, i.e. once no request holds its catalog anymore.
+    """
+
+    def __init__(self, catalog):
+        data_handler, job_index = catalog.data_handler, catalog.job_index
+        location_ids, self.location_lookup = _normalized_codes(catalog.jobs, 'location')
+        industry_ids, self.industry_lookup = _normalized_codes(catalog.jobs, 'industry')
+        arrays = {
+            'live': data_handler.live,
+            'location': location_ids,
+            'industry': industry_ids,
+            'salary_max': data_handler.salary_max,
+            'title_ids': job_index.title_ids,
+            'skill_set_ids': job_index.skill_set_ids,
+            'skill_set_offsets': job_index.skill_set_offsets,
+            'skill_set_sizes': job_index.skill_set_sizes,
+            'skill_set_members': job_index.skill_set_members,
+        }
+        self.size = len(data_handler.live)
+        segments, layout = [], {}
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            segments.append(segment)
+            np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf)[...] = values
+            layout[name] = (segment.name, values.dtype.str, values.shape)
+        self.spec = {'key': uuid.uuid4().hex, 'arrays': layout}
+        weakref.finalize(self, _release, segments, os.getpid())
+
+    def value_table(self, lookup, normalized_values):
+        table = np.zeros(len(lookup) + 1, dtype=bool)
+        table[[lookup[value] for value in normalized_values if value in lookup]] = True
+        return table
+
+# Worker-process side: the segments of the catalog version used last.
+_attached = {}
+
+def _arrays_for(spec):
+    entry = _attached.get(spec['key'])
+    if entry is None:
+        # A new catalog version: drop the previous mapping first.
+        for segments, arrays in _attached.values():
+            arrays.clear()
+            for segment in segments:
+                segment.close()
+        _attached.clear()
+        segments, arrays = [], {}
+        for name, (segment_name, dtype, shape) in spec['arrays'].items():
+            segment = shared_memory.SharedMemory(name=segment_name)
+            segments.append(segment)
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        entry = _attached[spec['key']] = (segments, arrays)
+    return entry[1]
+
+def _skill_scores(arrays, job_set_ids, request):
+    # Same computation as JobEmbeddingIndex.skill_set_scores/skill_set_overlaps for the shard's sets.
+    sizes = arrays['skill_set_sizes']
+    used_sets = np.zeros(len(sizes), dtype=bool)
+    used_sets[job_set_ids] = True
+    set_ids = np.flatnonzero(used_sets)
+
+    overlaps = np.zeros(len(set_ids), dtype=np.int64)
+    semantic = np.zeros(len(set_ids), dtype=np.float32)
+    present = sizes[set_ids] > 0
+    if present.any() and (request['skill_indicator'] is not None or request['skill_scores'] is not None):
+        members, starts = skill_set_segments(arrays['skill_set_offsets'], sizes, arrays['skill_set_members'], set_ids)
+        if request['skill_indicator'] is not None:
+            overlaps[present] = np.add.reduceat(request['skill_indicator'][members], starts)
+        if request['skill_scores'] is not None:
+            semantic[present] = np.maximum.reduceat(request['skill_scores'][members], starts, axis=0).mean(axis=1)
+
+    set_scores = np.zeros(len(sizes))
+    set_scores[set_ids] = SkillsScorer.calculate_scores(request['candidate_skills'], sizes[set_ids], overlaps, semantic)
+    return set_scores[job_set_ids]
+
+def _score_shard(spec, start, stop, request):
+    """Scores catalog positions [start, stop); returns the shard's top-k (positions, raw scores, final scores) and its count above the threshold."""
+    arrays = _arrays_for(spec)
+    mask = arrays['live'][start:stop]
+    if request['locations'] is not None:
+        mask = mask & request['locations'][arrays['location'][start:stop]]
+    positions = np.flatnonzero(mask) + start
+
+    raw_scores = np.empty((len(positions), len(SCORE_COMPONENTS)), order='F')
+    for column, key, codes in ((2, 'locations', 'location'), (3, 'industries', 'industry')):
+        if request[key] is None:
+            raw_scores[:, column] = 100.0
+        else:
+            raw_scores[:, column] = np.where(request[key][arrays[codes][positions]], request[key + '_score'], 0.0)
+    if request['min_salary']:
+        raw_scores[:, 4] = np.where(arrays['salary_max'][positions] >= request['min_salary'], 100.0, 0.0)
+    else:
+        raw_scores[:, 4] = 100.0
+
+    reachable = can_pass_threshold(raw_scores, request['weights'], request['total_weight'])
+    positions, raw_scores = positions[reachable], np.asfortranarray(raw_scores[reachable])
+    raw_scores[:, 0] = _skill_scores(arrays, arrays['skill_set_ids'][positions], request)
+    if request['title_scores'] is None:
+        raw_scores[:, 1] = 0.0
+    else:
+        raw_scores[:, 1] = request['title_scores'][arrays['title_ids'][positions]].astype(np.float64) * 100
+
+    final_scores = combine_scores(raw_scores, request['weights'], request['total_weight'])
+    passing = np.flatnonzero(final_scores > 40)
+    top = passing[select_top(np.round(final_scores[passing]), request['top_k'])]
+    return positions[top], raw_scores[top], final_scores[top], len(passing)
+
+class ShardedScorer:
+    """Scores large catalogs across a persistent pool of worker processes.
+
+    The catalog is split into one contiguous position range per worker.
+    Each worker maps the catalog's arrays from shared memory
+    (`SharedCatalogArrays`), scores its range with the same rules as
+    `Recommender._score_catalog` and returns only its local top-k; the
+    parent merges those. Per request only the candidate's small vocabulary
+    score tables are sent. Catalogs under `min_jobs` are left to the
+    in-process path, where the pool's overhead would dominate.
+    """
+
+    def __init__(self, workers, min_jobs=100000):
+        self.workers = workers
+        self.min_jobs = min_jobs
+        self._lock = threading.Lock()
+        self._pool = ForkedProcessPool(workers)
+        self._published = weakref.WeakKeyDictionary()
+
+    def covers(self, catalog):
+        return len(catalog.data_handler.live) >= self.min_jobs
+
+    def publish(self, catalog):
+        """Copies `catalog`'s arrays into shared memory, if not done already."""
+        with self._lock:
+            shared = self._published.get(catalog)
+            if shared is None:
+                shared = self._published[catalog] = SharedCatalogArrays(catalog)
+            return shared
+
+    def _request(self, catalog, shared, candidate_prefs, norm_prefs, dynamic_weights, total_weight, top_k, vocab_scores):
+        job_index = catalog.job_index
+        skills = candidate_prefs.get('skills', [])
+        titles = candidate_prefs.get('titles', [])
+
+        skill_scores = vocab_scores.get('skills') if vocab_scores else None
+        if skill_scores is None and skills and job_index.skill_vectors is not None:
+            skill_scores = job_index.skill_vocab_scores(job_index.semantic_matcher.encode(skills))
+        if job_index.skill_vectors is None:
+            skill_scores = None
+        candidate_ids = [job_index._skill_lookup[s] for s in set(skills) if s in job_index._skill_lookup]
+        skill_indicator = None
+        if candidate_ids:
+            skill_indicator = np.zeros(len(job_index.skill_vocab), dtype=np.int64)
+            skill_indicator[candidate_ids] = 1
+
+        title_scores = None
+        if titles and job_index.title_vectors is not None:
+            title_scores = vocab_scores.get('titles') if vocab_scores else None
+            if title_scores is None:
+                title_scores = job_index.title_vocab_scores(job_index.semantic_matcher.encode(titles[:1]))
+                title_scores = None if title_scores is None else title_scores[:, 0]
+
+        request = {
+            'candidate_skills': skills,
+            'skill_scores': skill_scores,
+            'skill_indicator': skill_indicator,
+            'title_scores': title_scores,
+            'min_salary': candidate_prefs.get('min_salary'),
+            'weights': {key: dynamic_weights.get(key, 0) for key in SCORE_COMPONENTS},
+            'total_weight': total_weight,
+            'top_k': top_k,
+        }
+        for key, lookup in (('locations', shared.location_lookup), ('industries', shared.industry_lookup)):
+            values = norm_prefs[key]
+            request[key] = shared.value_table(lookup, values) if values else None
+            request[key + '_score'] = (1 / len(values)) * 100 if values else 0.0
+        return request
+
+    def top_k(self, catalog, candidate_prefs, norm_prefs, dynamic_weights, total_weight, top_k, vocab_scores=None):
+        """Returns (positions, raw_scores, final_scores, total) like `Recommender._rank`."""
+        shared = self.publish(catalog)
+        request = self._request(catalog, shared, candidate_prefs, norm_prefs, dynamic_weights, total_weight, top_k, vocab_scores)
+        bounds = np.linspace(0, shared.size, self.workers + 1).astype(np.int64)
+        with self._pool.use() as executor:
+            futures = [executor.submit(_score_shard, shared.spec, int(start), int(stop), request) for start, stop in zip(bounds[:-1], bounds[1:])]
+            results = [future.result() for future in futures]
+
+        positions = np.concatenate([result[0] for result in results])
+        raw_scores = np.concatenate([result[1] for result in results])
+        final_scores = np.concatenate([result[2] for result in results])
+        # Shards return their best first; restore catalog order so ties break as in one process.
+        order = np.argsort(positions, kind='stable')
+        positions, raw_scores, final_scores = positions[order], raw_scores[order], final_scores[order]
+        top = select_top(np.round(final_scores), top_k)
+        return positions[top], raw_scores[top], final_scores[top], sum(result[3] for result in results)
@@ -1,3 +1,5 @@
+import numpy as np
+from metrics import metrics
 from semantic_matcher import SemanticMatcher
 
 class SkillsScorer:
@@ -18,10 +20,32 @@ class SkillsScorer:
         if not job_skills:
             return 0
 
-        exact_match_score = self._calculate_jaccard_similarity(set(candidate_skills), set(job_skills))
-        
-        semantic_competency_score = self.semantic_matcher.get_similarity(candidate_skills, job_skills)
-        
-        competency_score = (0.4 * exact_match_score + 0.6 * semantic_competency_score) if candidate_skills else 0.0
+        with metrics.stage('skills_score'):
+            exact_match_score = self._calculate_jaccard_similarity(set(candidate_skills), set(job_skills))
+            
+            semantic_competency_score = self.semantic_matcher.get_similarity(candidate_skills, job_skills)
+            
+            competency_score = (0.4 * exact_match_score + 0.6 * semantic_competency_score) if candidate_skills else 0.0
+
+            return min(competency_score * 100, 100)
+
+    @staticmethod
+    def calculate_scores(candidate_skills, job_skill_counts, overlap_counts, semantic_scores):
+        """Vectorized `calculate_score` over many job skill sets at once.
+
+        `job_skill_counts` and `overlap_counts` hold, per skill set, its size
+        and the size of its intersection with the candidate's skills.
+        """
+        scores = np.zeros(len(job_skill_counts))
+        if not candidate_skills:
+            return scores
+
+        with metrics.stage('skills_score'):
+            has_skills = job_skill_counts > 0
+            overlap = overlap_counts[has_skills]
+            union = len(set(candidate_skills)) + job_skill_counts[has_skills] - overlap
+            exact_match_scores = overlap / union
 
-        return min(competency_score * 100, 100)
+            competency_scores = 0.4 * exact_match_scores + 0.6 * semantic_scores[has_skills].astype(np.float64)
+            scores[has_skills] = np.minimum(competency_scores * 100, 100)
+        return scores
@@ -0,0 +1,26 @@
+# file: sqlite_connection.py
+
+import os
+import sqlite3
+
+class ProcessLocalConnection:
+    """A SQLite connection to `path` in WAL mode, opened on first use in each process.
+
+    A SQLite connection must not be used across a fork (e.g. preloaded
+    gunicorn workers), so a process other than the one that opened it gets
+    its own. The connection is in autocommit mode and may be used from any
+    thread; callers serialize access with their own lock.
+    """
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+
+    def get(self):
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._pid = os.getpid()
+        return self._conn
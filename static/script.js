@@ -3,6 +3,9 @@
 document.addEventListener('DOMContentLoaded', () => {
   let currentRecommendations = [];
   let currentPreferences = {};
+  let currentWeights = {};
+  let nextCursor = null;
+  const PAGE_SIZE = 5;
 
   const form = document.getElementById('preferences-form');
   const resultsArea = document.getElementById('results-area');
@@ -127,6 +130,45 @@ document.addEventListener('DOMContentLoaded', () => {
 
   init();
   
+  const readJson = async (res) => {
+      const responseText = await res.text();
+      let parsed;
+      try { parsed = JSON.parse(responseText); }
+      catch(e) { parsed = null; }
+      if (!res.ok && res.status !== 429) {
+          const message = parsed && parsed.error ? parsed.error : responseText || `HTTP ${res.status}`;
+          throw new Error(message);
+      }
+      return parsed;
+  };
+
+  const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+  // Queues the resume, waiting out 429s, then polls the job until it is done.
+  async function parseResumeInBackground(formData) {
+      let job;
+      for (let attempt = 0; ; attempt++) {
+          const res = await fetch('/parse_resume?async=1', { method: 'POST', body: formData });
+          job = await readJson(res);
+          if (res.status !== 429) break;
+          if (attempt >= 5) throw new Error(job && job.error ? job.error : 'The server is busy.');
+          const wait = parseInt(res.headers.get('Retry-After'), 10) || 2;
+          resumeStatus.innerHTML = `<i data-feather="loader" class="spin"></i> Server busy, retrying in ${wait}s...`;
+          replaceIcons();
+          await sleep(wait * 1000);
+      }
+
+      while (true) {
+          await sleep(500);
+          job = await readJson(await fetch(`/parse_resume/${job.job_id}`));
+          if (job.status === 'done') return job.result;
+          if (job.status === 'failed') throw new Error(job.error);
+          const progress = job.status === 'extracting' && job.pages ? ` (page ${job.pages_done}/${job.pages})` : '';
+          resumeStatus.innerHTML = `<i data-feather="loader" class="spin"></i> ${job.status === 'analyzing' ? 'Analyzing' : 'Parsing'}...${progress}`;
+          replaceIcons();
+      }
+  }
+
   async function handleResumeUpload(event) {
       const file = event.target.files[0];
       if (!file) return;
@@ -139,24 +181,7 @@ document.addEventListener('DOMContentLoaded', () => {
       formData.append('resume', file);
 
       try {
-          const res = await fetch('/parse_resume', {
-              method: 'POST',
-              body: formData,
-          });
-
-          const responseText = await res.text();
-          if (!res.ok) {
-              let parsedError;
-              try { parsedError = JSON.parse(responseText); }
-              catch(e) { parsedError = null; }
-              const message = parsedError && parsedError.error ? parsedError.error : responseText || `HTTP ${res.status}`;
-              throw new Error(message);
-          }
-
-          const parsedData = JSON.parse(responseText);
-          if (parsedData.error) {
-              throw new Error(parsedData.error);
-          }
+          const parsedData = await parseResumeInBackground(formData);
 
           const anySkills = safeArrayFill('skills', parsedData.skills);
           const anyTitles = safeArrayFill('titles', parsedData.titles);
@@ -179,6 +204,28 @@ document.addEventListener('DOMContentLoaded', () => {
       }
   };
 
+  // Fetches one page of matches; pass the previous page's next_cursor for the one after it.
+  const fetchPage = async (cursor) => {
+    const res = await fetch('/recommend', {
+      method: 'POST',
+      headers: {'Content-Type':'application/json'},
+      body: JSON.stringify({preferences: currentPreferences, weights: currentWeights, limit: PAGE_SIZE, cursor})
+    });
+
+    const text = await res.text();
+
+    if (!res.ok) {
+      let parsed;
+      try { parsed = JSON.parse(text); }
+      catch(e) { parsed = null; }
+      const message = parsed && parsed.error ? parsed.error : text || `HTTP ${res.status}`;
+      throw new Error(message);
+    }
+
+    try { return JSON.parse(text); }
+    catch (e) { throw new Error('Invalid JSON returned from server: ' + text); }
+  };
+
   form.addEventListener('submit', async (ev) => {
     ev.preventDefault();
     submitBtn.disabled = true;
@@ -198,33 +245,15 @@ document.addEventListener('DOMContentLoaded', () => {
       industries: getArrayFromInput('industries'),
     };
 
-    const weights = {};
+    currentWeights = {};
     getEnabledSliders().forEach(s => {
-      weights[s.dataset.weightKey] = Number(s.value);
+      currentWeights[s.dataset.weightKey] = Number(s.value);
     });
 
     try {
-      const res = await fetch('/recommend', {
-        method: 'POST',
-        headers: {'Content-Type':'application/json'},
-        body: JSON.stringify({preferences: currentPreferences, weights})
-      });
-
-      const text = await res.text();
-
-      if (!res.ok) {
-        let parsed;
-        try { parsed = JSON.parse(text); }
-        catch(e) { parsed = null; }
-        const message = parsed && parsed.error ? parsed.error : text || `HTTP ${res.status}`;
-        throw new Error(message);
-      }
-
-      let data;
-      try { data = JSON.parse(text); }
-      catch (e) { throw new Error('Invalid JSON returned from server: ' + text); }
-
-      currentRecommendations = data;
+      const page = await fetchPage(null);
+      currentRecommendations = page.results;
+      nextCursor = page.next_cursor;
       renderJobs(currentRecommendations);
 
     } catch (err) {
@@ -251,7 +280,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const cardsHtml = jobs.map((job, index) => {
       const score = Number(job.match_score) || 0;
       return `
-        <article class="job-card" style="animation-delay: ${index * 100}ms;" data-job-id="${escapeHtml(job.job_id)}">
+        <article class="job-card" style="animation-delay: ${(index % PAGE_SIZE) * 100}ms;" data-job-id="${escapeHtml(job.job_id)}">
           <div class="card-header">
             <div>
               <h3>${escapeHtml(job.job_title)}</h3>
@@ -267,11 +296,33 @@ document.addEventListener('DOMContentLoaded', () => {
           <div class="validation-view" style="display: none;"></div>
         </article>`;
     }).join('');
-    resultsArea.innerHTML = cardsHtml;
+    const moreHtml = nextCursor ? '<button type="button" id="load-more-btn" class="secondary-btn load-more-btn"><i data-feather="chevrons-down"></i> Show more matches</button>' : '';
+    resultsArea.innerHTML = cardsHtml + moreHtml;
     replaceIcons();
     addValidationListeners();
+    addLoadMoreListener();
   };
 
+  function addLoadMoreListener() {
+    const button = document.getElementById('load-more-btn');
+    if (!button) return;
+    button.addEventListener('click', async () => {
+      button.disabled = true;
+      button.innerHTML = '<i data-feather="loader" class="spin"></i> Loading...';
+      replaceIcons();
+      try {
+        const page = await fetchPage(nextCursor);
+        currentRecommendations = currentRecommendations.concat(page.results);
+        nextCursor = page.next_cursor;
+        renderJobs(currentRecommendations);
+      } catch (err) {
+        button.disabled = false;
+        button.innerHTML = `<i data-feather="alert-triangle"></i> ${escapeHtml(err.message)} - retry`;
+        replaceIcons();
+      }
+    });
+  }
+
   function addValidationListeners() {
     document.querySelectorAll('.validate-btn').forEach(button => {
         button.addEventListener('click', e => {
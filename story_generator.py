@@ -2,16 +2,21 @@
 
 import os
 import json
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+from concurrent.futures import ThreadPoolExecutor, wait
+from caching import LRUCache, SQLiteLRUCache
+from genai_client import GenAIClient
+from metrics import metrics
 
 class StoryGenerator:
-    def __init__(self, api_key):
-        if genai is None:
+    def __init__(self, api_key, max_workers=5, timeout=8.0, cache_size=1024, cache_path=None, model_factory=None):
+        self.genai = GenAIClient(api_key, model_factory)
+        if self.genai.sdk_missing():
             print("WARNING: Google Generative AI SDK is not installed. Story generation will be disabled.")
-        self.api_key = api_key
+        self.timeout = timeout
+        self.cache = SQLiteLRUCache(cache_path, max_size=cache_size, table='stories') if cache_path else LRUCache(max_size=cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='story')
+        metrics.register_gauge('story_cache_hits', lambda: self.cache.hits, "Match Story cache hits.")
+        metrics.register_gauge('story_cache_misses', lambda: self.cache.misses, "Match Story cache misses.")
 
     def _construct_prompt(self, candidate_prefs, job_details):
         c_skills = ", ".join(candidate_prefs.get('skills', []))
@@ -27,16 +32,60 @@ class StoryGenerator:
         """
         return prompt
 
+    def _cache_key(self, candidate_prefs, job_details):
+        skills = sorted({s.lower().strip() for s in candidate_prefs.get('skills', [])})
+        # The title and skills are part of the key so an updated job gets a fresh story.
+        return json.dumps([skills, str(job_details.get('job_id')), job_details.get('title'), list(job_details.get('required_skills', []))])
+
+    def _fallback_story(self, job_details):
+        return f"This role aligns well with your skills in {', '.join(job_details.get('required_skills', [])[:2])}."
+
     def generate_story(self, candidate_prefs, job_details):
-        if not self.api_key or self.api_key == "YOUR_API_KEY_HERE" or not genai:
+        if not self.genai.available():
             return "Story generation is unavailable. Check API key in app.py."
 
+        cache_key = self._cache_key(candidate_prefs, job_details)
+        story = self.cache.get(cache_key)
+        if story is not None:
+            return story
+
         prompt = self._construct_prompt(candidate_prefs, job_details)
         
         try:
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(prompt)
-            return response.text.strip()
+            with metrics.stage('story.llm'):
+                model = self.genai.new_model()
+                response = model.generate_content(prompt)
+                story = response.text.strip()
         except Exception as e:
             print(f"Error calling Gemini API for story generation: {e}")
-            return f"This role aligns well with your skills in {', '.join(job_details.get('required_skills', [])[:2])}."
+            metrics.inc('llm_requests', component='story', outcome='error')
+            return self._fallback_story(job_details)
+
+        metrics.inc('llm_requests', component='story', outcome='ok')
+        self.cache.put(cache_key, story)
+        return story
+
+    def generate_stories(self, candidate_prefs, jobs_details):
+        """Generates stories for several jobs concurrently, in input order.
+
+        Jobs without a story after `timeout` seconds get the template story.
+        Calls already running finish in the pool and cache their result;
+        calls still queued are cancelled, so a slow LLM cannot build up a
+        backlog that outlives it.
+        """
+        if not self.genai.available():
+            return [self.generate_story(candidate_prefs, job_details) for job_details in jobs_details]
+
+        futures = [self._executor.submit(self.generate_story, candidate_prefs, job_details) for job_details in jobs_details]
+        wait(futures, timeout=self.timeout)
+
+        stories = []
+        for future, job_details in zip(futures, jobs_details):
+            if future.done():
+                stories.append(future.result())
+            else:
+                print(f"Story generation for job {job_details.get('job_id')} exceeded {self.timeout}s; using template.")
+                metrics.inc('story_fallbacks', reason='timeout')
+                future.cancel()
+                stories.append(self._fallback_story(job_details))
+        return stories
@@ -0,0 +1,27 @@
+# file: conftest.py
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_encoder import FakeSentenceEncoder
+from semantic_matcher import SemanticMatcher
+
+# Every test shares the offline encoder, with the on-disk embedding cache off.
+# SemanticMatcher is a singleton, so this must happen before anything creates one.
+SemanticMatcher.model_factory = FakeSentenceEncoder()
+SemanticMatcher.CACHE_DIR = ''
+SemanticMatcher.BATCH_WINDOW_MS = 0
+
+@pytest.fixture(scope='session')
+def make_recommender(tmp_path_factory):
+    """Returns `make(jobs_df, **kwargs)`: writes `jobs_df` as a new catalog CSV and builds a `Recommender` on it."""
+    from matching_engine import Recommender
+
+    def make(jobs_df, **kwargs):
+        path = tmp_path_factory.mktemp('catalog') / 'jobs.csv'
+        jobs_df.to_csv(path, index=False)
+        return Recommender(str(path), api_key=None, **kwargs)
+    return make
@@ -0,0 +1,58 @@
+# file: test_batch_match.py
+
+import importlib
+import json
+import os
+import pytest
+import batch_match
+from data.generate_data import generate_candidates, generate_jobs
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope='module')
+def recommender(make_recommender):
+    return make_recommender(generate_jobs(200, seed=9))
+
+BAD_ENTRIES = [
+    '{"id": "not-json"',
+    '["a", "list"]',
+    {"id": "prefs", "preferences": "Python", "weights": {"skills": 1}},
+    {"id": "skills", "preferences": {"skills": "Python"}, "weights": {"skills": 1}},
+    {"id": "titles", "preferences": {"titles": [["nested"]]}, "weights": {"title": 1}},
+    {"id": "salary", "preferences": {"min_salary": "lots"}, "weights": {"salary": 1}},
+    {"id": "weights", "preferences": {"skills": ["Python"]}, "weights": {"skills": "x"}},
+    {"id": "weights-list", "preferences": {}, "weights": [1, 2]},
+]
+
+def test_malformed_entries_get_error_lines(recommender):
+    good = generate_candidates(6, seed=2)
+    items = []
+    for candidate, bad in zip(good, BAD_ENTRIES):
+        items += [candidate, bad]
+    lines = [json.loads(line) for line in batch_match.stream_ndjson(recommender, items, top_k=3, block_size=4)]
+
+    assert [line['index'] for line in lines] == list(range(len(items)))
+    for line, item in zip(lines, items):
+        if item in good:
+            expected = recommender._recommend(item, top_k=3, with_stories=False, use_cache=False)
+            assert line['recommendations'] == json.loads(json.dumps(expected, default=str))
+        else:
+            assert 'error' in line and 'recommendations' not in line
+
+def test_cli_rejects_top_k_below_one(capsys):
+    with pytest.raises(SystemExit):
+        batch_match.main(['-', '--top-k', '0'])
+    assert 'must be at least 1' in capsys.readouterr().err
+
+def test_endpoint_rejects_invalid_top_k(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.setenv('RESUME_CACHE_PATH', '')
+    monkeypatch.setenv('CATALOG_CHANGES_PATH', '')
+    app = importlib.import_module('app')
+    client = app.app.test_client()
+    for top_k in ('0', '-3', 'abc', ''):
+        response = client.post(f'/recommend/batch?top_k={top_k}', json=[generate_candidates(1, seed=1)[0]])
+        assert response.status_code == 400, top_k
+    response = client.post('/recommend/batch?top_k=2', json=[generate_candidates(1, seed=1)[0], {"weights": {"skills": "x"}}])
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert 'recommendations' in lines[0] and 'error' in lines[1]
@@ -0,0 +1,32 @@
+# file: test_caching.py
+
+from caching import LRUCache
+from data.generate_data import generate_candidates, generate_jobs
+
+def test_weight_cap_evicts_least_recently_used():
+    cache = LRUCache(max_size=10, max_weight=10, weigh=len)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    assert cache.get('a') == 'xxxx'
+    cache.put('c', 'xxxx')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'xxxx' and cache.get('c') == 'xxxx'
+    assert cache.weight == 8
+    cache.put('a', 'x')
+    assert cache.weight == 5
+    # Too heavy on its own: not cached, and nothing else is evicted for it.
+    cache.put('d', 'x' * 11)
+    assert cache.get('d') is None and cache.weight == 5
+    cache.clear()
+    assert cache.weight == 0 and len(cache) == 0
+
+def test_score_cache_stays_under_its_byte_cap(make_recommender):
+    # About two full-catalog entries' worth (2000 jobs x ~49 bytes each).
+    recommender = make_recommender(generate_jobs(2000, seed=8), score_cache_mb=0.2)
+    for candidate in generate_candidates(20, seed=8):
+        candidate['preferences']['locations'] = []
+        recommender._recommend(candidate, top_k=5, with_stories=False)
+    cache = recommender.score_cache
+    assert 0 < len(cache) <= 2
+    assert cache.weight <= 0.2 * 1024 * 1024
+    assert cache.weight == sum(sum(array.nbytes for array in entry[0]) for entry in cache._entries.values())
@@ -0,0 +1,83 @@
+# file: test_catalog.py
+
+import os
+import pandas as pd
+import pytest
+from data.generate_data import generate_jobs
+from job_store import JobStore
+
+@pytest.fixture
+def recommender(make_recommender):
+    return make_recommender(generate_jobs(50, seed=3))
+
+def test_partial_upsert_is_rejected(recommender):
+    job_id = recommender.jobs.row(0)['job_id']
+    with pytest.raises(ValueError, match="missing location"):
+        recommender.update_catalog([{'job_id': job_id, 'title': 'Renamed'}])
+    assert recommender.catalog.version == 0
+    assert recommender.jobs.row(0)['location'] is not None
+
+def test_upsert_without_industry_is_rejected(recommender):
+    job = dict(recommender.jobs.row(0), job_id='NEW-1', industry='  ')
+    with pytest.raises(ValueError, match="missing industry"):
+        recommender.update_catalog([job])
+
+def test_csv_rows_missing_required_fields_are_skipped(tmp_path):
+    jobs = generate_jobs(5, seed=4)
+    jobs.loc[1, 'title'] = None
+    jobs.loc[2, 'industry'] = ''
+    jobs.loc[3, 'salary_range'] = None
+    path = tmp_path / 'jobs.csv'
+    jobs.to_csv(path, index=False)
+    store, report = JobStore.from_csv(str(path))
+    assert len(store) == 2
+    assert report['bad_rows'] == 3
+
+def test_full_upsert_replaces_the_job(recommender):
+    job = dict(recommender.jobs.row(0), title='Renamed Engineer')
+    recommender.update_catalog([job])
+    assert recommender.jobs.row(0)['title'] == 'Renamed Engineer'
+    results = recommender.get_recommendations({'preferences': {'titles': ['Renamed Engineer'], 'industries': ['FinTech']}, 'weights': {'title': 100, 'industry': 10}})
+    assert results[0]['job_id'] == job['job_id']
+
+def test_logged_changes_reach_every_process(tmp_path, make_recommender):
+    from catalog_changes import CatalogChangeLog
+    jobs = generate_jobs(60, seed=5)
+    # Two gunicorn workers: each has its own Recommender and connection to the log.
+    first = make_recommender(jobs, change_log=CatalogChangeLog(str(tmp_path / 'changes.sqlite')))
+    second = make_recommender(jobs, change_log=CatalogChangeLog(str(tmp_path / 'changes.sqlite')))
+
+    added = dict(first.jobs.row(0), job_id='NEW-1', title='Quantum Engineer')
+    first.update_catalog([added], deleted_ids=[jobs['job_id'][1]])
+    with pytest.raises(ValueError):
+        first.update_catalog([{'job_id': 'NEW-2'}])
+    # The second worker is behind, so it applies the first change before its own.
+    second.update_catalog(pd.DataFrame([dict(added, job_id='NEW-3')]))
+    assert first.sync_changes() == 1
+    assert second.sync_changes() == 0
+    restarted = make_recommender(jobs, change_log=CatalogChangeLog(str(tmp_path / 'changes.sqlite')))
+
+    query = {'preferences': {'titles': ['Quantum Engineer']}, 'weights': {'title': 100}}
+    for recommender in (first, second, restarted):
+        assert recommender.catalog.version == 2
+        assert len(recommender.data_handler.live_positions) == 61
+        assert [r['job_id'] for r in recommender.get_recommendations(query)[:2]] == ['NEW-1', 'NEW-3']
+
+    reloaded = first.reload_catalog()
+    assert reloaded['jobs'] == 61
+
+@pytest.mark.parametrize('contents', [None, '', 'header-only'])
+def test_reload_from_an_unusable_file_keeps_the_catalog(recommender, contents):
+    path = recommender.jobs_file_path
+    with open(path) as f:
+        header = f.readline()
+    if contents is None:
+        os.remove(path)
+    else:
+        with open(path, 'w') as f:
+            f.write(header if contents == 'header-only' else contents)
+    catalog = recommender.catalog
+    with pytest.raises(ValueError):
+        recommender.reload_catalog()
+    assert recommender.catalog is catalog
+    assert recommender.get_recommendations({'preferences': {}, 'weights': {'salary': 100}})
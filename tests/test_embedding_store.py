@@ -0,0 +1,54 @@
+# file: test_embedding_store.py
+
+import threading
+import numpy as np
+from embedding_store import EmbeddingStore
+from fake_encoder import FakeSentenceEncoder
+from semantic_matcher import SemanticMatcher
+
+def test_concurrent_lookups_and_adds(tmp_path):
+    encoder = FakeSentenceEncoder(dim=16)
+    store = EmbeddingStore(str(tmp_path), 'fake', 16)
+    errors = []
+
+    def work(worker):
+        try:
+            for batch in range(30):
+                texts = [f"text {worker} {batch} {i}" for i in range(5)] + [f"shared {batch}"]
+                expected = encoder.encode(texts, normalize_embeddings=True)
+                vectors, missing = store.lookup(texts)
+                if missing:
+                    store.add([texts[i] for i in missing], expected[missing])
+                found = [i for i in range(len(texts)) if i not in missing]
+                assert np.allclose(vectors[found], expected[found])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    vectors, missing = EmbeddingStore(str(tmp_path), 'fake', 16).lookup(["shared 3", "text 7 29 4"])
+    assert missing == []
+    assert np.allclose(vectors, encoder.encode(["shared 3", "text 7 29 4"], normalize_embeddings=True))
+
+class BrokenStore:
+    def __init__(self, fail_lookup):
+        self.fail_lookup = fail_lookup
+
+    def lookup(self, texts):
+        if self.fail_lookup:
+            raise OSError("Input/output error")
+        return np.zeros((len(texts), SemanticMatcher._model.get_sentence_embedding_dimension()), dtype=np.float32), list(range(len(texts)))
+
+    def add(self, texts, vectors):
+        raise OSError("No space left on device")
+
+def test_encode_skips_a_failing_cache(monkeypatch):
+    matcher = SemanticMatcher()
+    expected = matcher._encode_with_model(["Python", "Java"])
+    for fail_lookup in (True, False):
+        monkeypatch.setattr(SemanticMatcher, '_store', BrokenStore(fail_lookup))
+        assert np.array_equal(matcher.encode(["Python", "Java"]), expected)
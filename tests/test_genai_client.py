@@ -0,0 +1,26 @@
+# file: test_genai_client.py
+
+from fake_genai import FakeGenerativeModel
+from genai_client import GENAI_INSTALLED, GenAIClient
+from resume_parser import ResumeParser
+from story_generator import StoryGenerator
+
+def test_model_factory_stands_in_for_the_sdk():
+    fake = FakeGenerativeModel()
+    client = GenAIClient(api_key=None, model_factory=fake)
+    assert client.available() and not client.sdk_missing()
+    assert client.new_model() is fake
+
+def test_placeholder_key_is_unavailable():
+    client = GenAIClient(api_key="YOUR_API_KEY_HERE")
+    assert not client.available()
+    assert client.sdk_missing() == (not GENAI_INSTALLED)
+
+def test_story_generator_and_resume_parser_share_the_client():
+    fake = FakeGenerativeModel(response="A great fit.")
+    stories = StoryGenerator(api_key=None, model_factory=fake)
+    jobs = [{'job_id': 'J1', 'title': 'Data Scientist', 'required_skills': ['Python']}]
+    assert stories.generate_stories({'skills': ['Python']}, jobs) == ["A great fit."]
+    assert fake.calls == 1
+    assert ResumeParser(api_key=None, model_factory=fake).genai.available()
+    assert StoryGenerator(api_key=None).generate_story({}, jobs[0]) == "Story generation is unavailable. Check API key in app.py."
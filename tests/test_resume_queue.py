@@ -0,0 +1,53 @@
+# file: test_resume_queue.py
+
+import sqlite3
+import threading
+import pytest
+from caching import LRUCache
+from resume_queue import ResumeQueue
+
+class StubParser:
+    """Finishes every job at once with a "missing library" failure."""
+
+    def libraries_missing(self):
+        return True
+
+class LockedStore(LRUCache):
+    """A store whose writes fail, like a SQLite file another worker holds locked."""
+
+    def __init__(self, locked_statuses):
+        super().__init__()
+        self.locked_statuses = locked_statuses
+
+    def put(self, key, value):
+        if value['status'] in self.locked_statuses:
+            raise sqlite3.OperationalError("database is locked")
+        super().put(key, value)
+
+def wait_until_idle(queue):
+    for _ in range(200):
+        if queue.pending == 0:
+            return
+        threading.Event().wait(0.01)
+
+def test_failed_final_write_frees_the_slot():
+    queue = ResumeQueue(StubParser(), LockedStore({'failed'}), max_pending=1)
+    job_id = queue.submit(b'%PDF')
+    assert job_id is not None
+    wait_until_idle(queue)
+    assert queue.pending == 0
+    assert queue.status(job_id) == {"status": "queued"}
+    assert queue.submit(b'%PDF') is not None
+
+def test_failed_submit_gives_the_slot_back():
+    queue = ResumeQueue(StubParser(), LockedStore({'queued'}), max_pending=1)
+    for _ in range(3):
+        with pytest.raises(sqlite3.OperationalError):
+            queue.submit(b'%PDF')
+    assert queue.pending == 0
+
+def test_parse_failures_are_reported():
+    queue = ResumeQueue(StubParser(), LRUCache(), max_pending=2)
+    job_id = queue.submit(b'%PDF')
+    wait_until_idle(queue)
+    assert queue.status(job_id) == {"status": "failed", "error": "A required library is not installed on the server."}
@@ -0,0 +1,33 @@
+# file: test_story_generator.py
+
+from fake_genai import FakeGenerativeModel
+from story_generator import StoryGenerator
+
+PREFS = {'skills': ['Python', 'SQL']}
+
+def job(job_id, title='Data Engineer'):
+    return {'job_id': job_id, 'title': title, 'required_skills': ['Python', 'Spark', 'SQL']}
+
+def test_stories_are_cached_per_candidate_and_job():
+    fake = FakeGenerativeModel(response="A great fit.")
+    stories = StoryGenerator(api_key=None, model_factory=fake)
+    jobs = [job('J1'), job('J2')]
+    assert stories.generate_stories(PREFS, jobs) == ["A great fit."] * 2
+    assert stories.generate_stories({'skills': ['sql ', 'python']}, jobs) == ["A great fit."] * 2
+    assert fake.calls == 2
+    assert (stories.cache.hits, stories.cache.misses) == (2, 2)
+
+    # A changed job gets a fresh story.
+    stories.generate_stories(PREFS, [job('J1', title='Analytics Engineer')])
+    assert fake.calls == 3
+
+def test_slow_stories_fall_back_and_queued_calls_are_cancelled():
+    fake = FakeGenerativeModel(delay=0.5, response="A great fit.")
+    stories = StoryGenerator(api_key=None, max_workers=1, timeout=0.1, model_factory=fake)
+    jobs = [job('J1'), job('J2'), job('J3')]
+    assert stories.generate_stories(PREFS, jobs) == [stories._fallback_story(j) for j in jobs]
+
+    # Only the call that had started runs to completion, and its story is cached.
+    stories._executor.shutdown(wait=True)
+    assert fake.calls == 1
+    assert stories.cache.get(stories._cache_key(PREFS, jobs[0])) == "A great fit."